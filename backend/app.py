@@ -1,78 +1,262 @@
-from flask import Flask, request, jsonify
+import time
+STARTUP_BEGAN = time.perf_counter()
+
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
-import pandas as pd
-import numpy as np
-import joblib
+import datetime
+import hmac
 import json
+import logging
 import os
+import random
+import signal
+import threading
+
+from quote_engine import QuoteEngine, QuoteRequestError, BACKEND_DIR
+from model_registry import ModelRegistry, RegistryError
+from micro_batch import MicroBatcher
+from insights import load_insights, INSIGHTS_DIR
+from metrics import MetricsRegistry, StageTimer
+from model_metrics import load_model_metrics
 
 app = Flask(__name__)
 CORS(app)
 
+def reload_insights(directory=INSIGHTS_DIR):
+    """(Re)load the insight bundle and pre-serialize the GET responses"""
+    global insights_response, brands_response, insights_error
+    try:
+        insights_response, brands_response = load_insights(directory)
+        insights_error = None
+    except Exception as e:
+        insights_response = brands_response = None
+        insights_error = str(e)
+
+# Versioned artifacts under models/registry; without an active version the
+# engine serves the files in models/ directly
+registry = ModelRegistry(os.path.join(BACKEND_DIR, 'models', 'registry'))
+
+# Opt-in: coalesce concurrent single-quote predictions into one predict call
+# (only helps with threaded workers, e.g. gunicorn --threads 8)
+MICRO_BATCH = os.environ.get('MICRO_BATCH', '0') == '1'
+
+def build_engine(version=None):
+    """Create, load and warm up an engine for a registry version (or models/)"""
+    candidate = QuoteEngine.from_environ(
+        models_dir=registry.version_dir(version) if version else None
+    )
+    if MICRO_BATCH:
+        candidate.enable_micro_batching(
+            MicroBatcher,
+            max_batch_size=int(os.environ.get('MICRO_BATCH_MAX_SIZE', 64)),
+            window_ms=float(os.environ.get('MICRO_BATCH_WINDOW_MS', 2)),
+            latency_ceiling_ms=float(os.environ.get('MICRO_BATCH_LATENCY_CEILING_MS', 50))
+        )
+    candidate.warm_up()
+    return candidate
+
+metrics = MetricsRegistry()
+http_requests = metrics.counter(
+    'carinsure_http_requests_total', 'HTTP requests by endpoint, method and status',
+    ['endpoint', 'method', 'status']
+)
+request_latency = metrics.histogram(
+    'carinsure_http_request_duration_seconds', 'HTTP request latency by endpoint', ['endpoint']
+)
+quote_stage_latency = metrics.histogram(
+    'carinsure_quote_stage_duration_seconds', 'get-quote latency by pricing stage', ['stage']
+)
+request_errors = metrics.counter(
+    'carinsure_errors_total', 'Failed requests by endpoint and error type', ['endpoint', 'type']
+)
+metrics.gauge_function(
+    'carinsure_model_info', 'Model version being served',
+    lambda: {(engine.model_version, engine.artifact_source): 1}, ['version', 'source']
+)
+model_reloads = metrics.counter(
+    'carinsure_model_reloads_total', 'Model reloads and rollbacks by result', ['result']
+)
+
+def quote_cache_metric(key):
+    return lambda: engine.quote_cache.stats()[key]
+
+metrics.gauge_function('carinsure_quote_cache_entries', 'Quotes held in the LRU cache',
+                       quote_cache_metric('size'))
+for key in ['hits', 'misses', 'evictions', 'expirations']:
+    metrics.gauge_function(f'carinsure_quote_cache_{key}_total', f'Quote cache {key}',
+                           quote_cache_metric(key), kind='counter')
+
+if MICRO_BATCH:
+    def micro_batch_metric(key):
+        return lambda: engine.quote_batcher.stats()[key]
+
+    for key in ['requests', 'batches', 'timeouts']:
+        metrics.gauge_function(f'carinsure_micro_batch_{key}_total', f'Micro-batcher {key}',
+                               micro_batch_metric(key), kind='counter')
+    metrics.gauge_function(
+        'carinsure_micro_batch_size_batches', 'Micro-batches by power-of-two size bucket',
+        lambda: {(size,): count for size, count in engine.quote_batcher.stats()['batch_size_histogram'].items()},
+        ['size']
+    )
+
+# Structured request log: one JSON line for LOG_SAMPLE_RATE of requests and for every error
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', 0.01))
+request_log = logging.getLogger('carinsure.requests')
+if not request_log.handlers:
+    request_log.addHandler(logging.StreamHandler())
+    request_log.setLevel(logging.INFO)
+    request_log.propagate = False
+
+def record_error(e):
+    """Count a failed request by exception type"""
+    g.error_type = type(e).__name__
+    request_errors.inc(endpoint=request.url_rule.rule, type=g.error_type)
+
+@app.before_request
+def start_request_timer():
+    g.request_began = time.perf_counter()
+    follow_registry()
+
+@app.after_request
+def record_request(response):
+    elapsed = time.perf_counter() - g.request_began
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    http_requests.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    request_latency.observe(elapsed, endpoint=endpoint)
+
+    error_type = g.get('error_type')
+    if error_type is not None or random.random() < LOG_SAMPLE_RATE:
+        entry = {
+            "event": "request",
+            "endpoint": endpoint,
+            "method": request.method,
+            "status": response.status_code,
+            "duration_ms": round(elapsed * 1000, 3),
+            "model_version": engine.model_version
+        }
+        if error_type is not None:
+            entry["error"] = error_type
+        if 'stages' in g:
+            entry["stages_ms"] = {stage: round(seconds * 1000, 3) for stage, seconds in g.stages.items()}
+        request_log.info(json.dumps(entry))
+    return response
+
 # Load ML model and preprocessing artifacts
 print("🚀 Loading ML model and artifacts...")
-model = joblib.load('models/premium_predictor.pkl')
-scaler = joblib.load('models/scaler.pkl')
-encoders = joblib.load('models/encoders.pkl')
-feature_names = joblib.load('models/feature_names.pkl')
-df = pd.read_csv('data/insurance_processed.csv')
+engine = build_engine(registry.current())
+previous_engine = None
+reload_insights()
 
-print("✅ Backend ready!")
+# Hot reload: a new engine is loaded and warmed up in the background while
+# the current one keeps serving, then swapped in with a single assignment.
+# Routes read `engine` once per request, so no request sees a mixed set.
+reload_lock = threading.Lock()
+reload_status = {"state": "idle"}
 
-def prepare_features(user_data):
-    """Prepare user input for model prediction"""
-    
-    # Create feature dictionary
-    features = {}
-    
-    # Numerical features
-    features['age'] = user_data['age']
-    features['bmi'] = user_data.get('bmi', 25.0)  # Default BMI
-    features['children'] = user_data.get('children', 0)
-    features['annual_mileage'] = user_data['annual_mileage']
-    features['vehicle_age'] = 2025 - user_data['vehicle_year']
-    
-    # Encode categorical features
-    features['sex_encoded'] = encoders['sex'].transform([user_data['sex']])[0]
-    features['smoker_encoded'] = encoders['smoker'].transform([user_data['smoker']])[0]
-    features['region_encoded'] = encoders['region'].transform([user_data.get('region', 'northeast')])[0]
-    features['vehicle_make_encoded'] = encoders['vehicle_make'].transform([user_data['vehicle_make']])[0]
-    features['usage_type_encoded'] = encoders['usage_type'].transform([user_data['usage_type']])[0]
-    features['fuel_type_encoded'] = encoders['fuel_type'].transform([user_data['fuel_type']])[0]
-    
-    # Engineered features - age_group
-    age = user_data['age']
-    if age <= 25:
-        age_group = 'Young (18-25)'
-    elif age <= 40:
-        age_group = 'Adult (26-40)'
-    elif age <= 55:
-        age_group = 'Middle (41-55)'
-    else:
-        age_group = 'Senior (56+)'
-    features['age_group_encoded'] = encoders['age_group'].transform([age_group])[0]
-    
-    # Engineered features - vehicle_category
-    vehicle_make = user_data['vehicle_make']
-    if vehicle_make in ['Maruti', 'Tata']:
-        vehicle_category = 'Economy'
-    elif vehicle_make in ['BMW', 'Mercedes', 'Audi']:
-        vehicle_category = 'Luxury'
-    else:
-        vehicle_category = 'Mid-range'
-    features['vehicle_category_encoded'] = encoders['vehicle_category'].transform([vehicle_category])[0]
-    
-    # Binary features
-    features['high_mileage'] = 1 if user_data['annual_mileage'] > 20000 else 0
-    features['old_vehicle'] = 1 if features['vehicle_age'] > 7 else 0
-    
-    # Create DataFrame with correct feature order
-    feature_df = pd.DataFrame([features])[feature_names]
-    
-    # Scale features
-    scaled_features = scaler.transform(feature_df)
-    
-    return scaled_features, age_group, vehicle_category
+def swap_engine(candidate):
+    """Serve candidate; keep the replaced engine for instant rollback"""
+    global engine, previous_engine
+    retired = previous_engine
+    previous_engine, engine = engine, candidate
+    if retired is not None and retired is not candidate and retired.quote_batcher is not None:
+        retired.quote_batcher.close()
+
+def reload_model(version=None):
+    """Load version (default: the registry's active one) and swap it in
+
+    Returns False without doing anything when a reload is already running.
+    If loading fails the current engine keeps serving.
+    """
+    global reload_status
+    if not reload_lock.acquire(blocking=False):
+        return False
+    try:
+        version = version or registry.current()
+        began = time.perf_counter()
+        reload_status = {"state": "loading", "version": version}
+        if version is not None and previous_engine is not None and previous_engine.model_version == version:
+            candidate = previous_engine
+        else:
+            candidate = build_engine(version)
+        swap_engine(candidate)
+        reload_status = {
+            "state": "ready",
+            "version": candidate.model_version,
+            "duration_ms": round((time.perf_counter() - began) * 1000, 1),
+            "finished_at": datetime.datetime.now().isoformat(timespec='seconds')
+        }
+        model_reloads.inc(result='success')
+        print(f"🔄 Now serving model {candidate.model_version} from {candidate.artifact_source}")
+    except Exception as e:
+        reload_status = {
+            "state": "failed",
+            "version": version,
+            "error": str(e),
+            "finished_at": datetime.datetime.now().isoformat(timespec='seconds')
+        }
+        model_reloads.inc(result='failure')
+        print(f"❌ Model reload failed, still serving {engine.model_version}: {e}")
+    finally:
+        reload_lock.release()
+    return True
+
+def start_reload(version=None):
+    """Run reload_model in a background thread"""
+    threading.Thread(target=reload_model, args=(version,), name='model-reload', daemon=True).start()
+
+def rollback_model():
+    """Swap back to the previously served engine (already loaded, so instant)"""
+    with reload_lock:
+        target = previous_engine
+        if target is None:
+            raise RegistryError("No previous model version is loaded")
+        if registry.current() is not None:
+            # Point the registry back too, so other workers follow
+            try:
+                registry.activate(target.model_version)
+            except RegistryError:
+                pass
+        swap_engine(target)
+        model_reloads.inc(result='rollback')
+        print(f"↩️ Rolled back to model {target.model_version}")
+    return target
+
+# Every worker follows the registry's active version, checked at most every
+# MODEL_RELOAD_INTERVAL seconds (0 disables it)
+MODEL_RELOAD_INTERVAL = float(os.environ.get('MODEL_RELOAD_INTERVAL', 5))
+next_registry_check = time.monotonic() + MODEL_RELOAD_INTERVAL
+
+def follow_registry():
+    global next_registry_check
+    now = time.monotonic()
+    if MODEL_RELOAD_INTERVAL <= 0 or now < next_registry_check:
+        return
+    next_registry_check = now + MODEL_RELOAD_INTERVAL
+
+    current = registry.current()
+    if current is None or current == engine.model_version or reload_lock.locked():
+        return
+    if reload_status.get('state') == 'failed' and reload_status.get('version') == current:
+        return
+    start_reload(current)
+
+# SIGHUP reloads the registry's active version (standalone server or
+# non-preloaded gunicorn workers; the gunicorn master handles its own HUP)
+if hasattr(signal, 'SIGHUP') and threading.current_thread() is threading.main_thread():
+    signal.signal(signal.SIGHUP, lambda signum, frame: start_reload())
+
+def resident_memory_mb():
+    """Peak resident set size of this process in MB (None where unsupported)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+startup_ms = (time.perf_counter() - STARTUP_BEGAN) * 1000
+rss_mb = resident_memory_mb()
+print(f"✅ Backend ready in {startup_ms:.0f} ms from {engine.artifact_source}"
+      + (f" (RSS {rss_mb:.0f} MB)" if rss_mb is not None else ""))
 
 @app.route('/')
 def home():
@@ -82,9 +266,13 @@ def home():
         "version": "1.0.0",
         "endpoints": [
             "/api/get-quote",
+            "/api/get-quote/batch",
+            "/api/compare-plans",
+            "/api/what-if",
             "/api/insights",
             "/api/compare-brands",
-            "/api/savings-tips"
+            "/api/savings-tips",
+            "/metrics"
         ]
     })
 
@@ -93,339 +281,213 @@ def get_quote():
     """Get insurance quote based on user details"""
     
     try:
-        user_data = request.json
-        print(f"📥 Received quote request: {user_data}")
-        
-        # Validate required fields
-        required_fields = ['age', 'sex', 'smoker', 'vehicle_make', 'vehicle_year', 
-                          'annual_mileage', 'usage_type', 'fuel_type']
-        for field in required_fields:
-            if field not in user_data:
-                print(f"❌ Missing field: {field}")
-                return jsonify({"error": f"Missing required field: {field}"}), 400
-        
-        # Prepare features
-        scaled_features, age_group, vehicle_category = prepare_features(user_data)
-        
-        # Predict premium
-        monthly_premium = model.predict(scaled_features)[0]
-        yearly_premium = monthly_premium * 12 * 0.9  # 10% annual discount
+        timer = StageTimer()
+        user_data = request.get_json(silent=True)
+        timer.lap('parse')
         
-        # Calculate breakdown (simplified)
-        base_premium = monthly_premium * 0.60
-        vehicle_premium = monthly_premium * 0.25
-        addon_premium = monthly_premium * 0.10
-        tax_premium = monthly_premium * 0.05
+        response = jsonify(engine.quote(user_data, timer))
+        timer.lap('serialization')
         
-        # Find similar profiles
-        similar_mask = (
-            (df['vehicle_make'] == user_data['vehicle_make']) &
-            (df['age_group'] == age_group)
-        )
-        similar_premiums = df[similar_mask]['monthly_premium']
-        
-        if len(similar_premiums) > 0:
-            similar_avg = similar_premiums.mean()
-            similar_min = similar_premiums.min()
-            similar_max = similar_premiums.max()
-        else:
-            similar_avg = monthly_premium
-            similar_min = monthly_premium * 0.9
-            similar_max = monthly_premium * 1.1
-        
-        # Calculate percentile
-        all_premiums = df['monthly_premium'].values
-        percentile = (all_premiums < monthly_premium).sum() / len(all_premiums) * 100
-        
-        # Price factors
-        factors = []
-        
-        # Age factor
-        avg_by_age = df[df['age_group'] == age_group]['monthly_premium'].mean()
-        overall_avg = df['monthly_premium'].mean()
-        age_impact = avg_by_age - overall_avg
-        if abs(age_impact) > 50:
-            factors.append({
-                "factor": f"Your age ({user_data['age']})",
-                "impact": f"{'Adds' if age_impact > 0 else 'Saves'} ₹{abs(age_impact):.0f}/month",
-                "type": "negative" if age_impact > 0 else "positive"
-            })
-        
-        # Vehicle factor
-        avg_by_vehicle = df[df['vehicle_make'] == user_data['vehicle_make']]['monthly_premium'].mean()
-        vehicle_impact = avg_by_vehicle - overall_avg
-        if abs(vehicle_impact) > 50:
-            factors.append({
-                "factor": f"Vehicle ({user_data['vehicle_make']})",
-                "impact": f"{'Adds' if vehicle_impact > 0 else 'Saves'} ₹{abs(vehicle_impact):.0f}/month",
-                "type": "negative" if vehicle_impact > 0 else "positive"
-            })
-        
-        # Smoking factor
-        if user_data['smoker'] == 'yes':
-            smoker_impact = df[df['smoker'] == 'yes']['monthly_premium'].mean() - df[df['smoker'] == 'no']['monthly_premium'].mean()
-            factors.append({
-                "factor": "Smoker",
-                "impact": f"Adds ₹{smoker_impact:.0f}/month",
-                "type": "negative"
-            })
-        else:
-            nonsmoker_impact = df[df['smoker'] == 'no']['monthly_premium'].mean() - df[df['smoker'] == 'yes']['monthly_premium'].mean()
-            factors.append({
-                "factor": "Non-smoker",
-                "impact": f"Saves ₹{abs(nonsmoker_impact):.0f}/month",
-                "type": "positive"
-            })
-        
-        # Mileage factor
-        if user_data['annual_mileage'] > 20000:
-            high_mileage_avg = df[df['annual_mileage'] > 20000]['monthly_premium'].mean()
-            low_mileage_avg = df[df['annual_mileage'] <= 20000]['monthly_premium'].mean()
-            mileage_impact = high_mileage_avg - low_mileage_avg
-            factors.append({
-                "factor": "High mileage",
-                "impact": f"Adds ₹{mileage_impact:.0f}/month",
-                "type": "negative"
-            })
-        
-        # Build response
-        response = {
-            "monthlyPremium": round(monthly_premium, 2),
-            "yearlyPremium": round(yearly_premium, 2),
-            "breakdown": {
-                "base": round(base_premium, 2),
-                "vehicle": round(vehicle_premium, 2),
-                "addons": round(addon_premium, 2),
-                "taxes": round(tax_premium, 2)
-            },
-            "factors": factors,
-            "comparison": {
-                "message": f"You're paying {'LESS' if monthly_premium < similar_avg else 'MORE'} than {abs(percentile - 50):.0f}% of similar drivers!",
-                "percentile": round(percentile, 1),
-                "similarProfiles": {
-                    "average": round(similar_avg, 2),
-                    "range": f"₹{similar_min:.0f}-₹{similar_max:.0f}/month"
-                }
-            },
-            "features": {
-                "liability": "Up to ₹15 Lakh",
-                "collision": "Included",
-                "roadside": "24/7 Assistance",
-                "cashless": "5000+ garages",
-                "accident": "Personal Accident Cover"
-            }
-        }
-        
-        return jsonify(response)
+        for stage, seconds in timer.stages.items():
+            quote_stage_latency.observe(seconds, stage=stage)
+        g.stages = timer.stages
+        return response
+    
+    except QuoteRequestError as e:
+        record_error(e)
+        return jsonify(e.to_dict()), 400
     
     except Exception as e:
+        record_error(e)
         print(f"❌ Error in get_quote: {str(e)}")
         import traceback
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/insights', methods=['GET'])
-def get_insights():
-    """Get all insurance insights"""
+@app.route('/api/get-quote/batch', methods=['POST'])
+def get_quote_batch():
+    """Price many applicants with a single model prediction"""
     
     try:
-        insights = {}
-        
-        insight_files = [
-            'brand_comparison',
-            'age_vs_premium',
-            'smoking_impact',
-            'mileage_impact',
-            'vehicle_age_impact',
-            'gender_comparison',
-            'region_comparison',
-            'fuel_type_comparison',
-            'usage_type_comparison',
-            'savings_calculator',
-            'most_popular',
-            'premium_distribution'
-        ]
-        
-        for insight_file in insight_files:
-            with open(f'visualization_data/{insight_file}.json', 'r') as f:
-                insights[insight_file] = json.load(f)
+        payload = request.get_json(silent=True)
+        records = payload.get('records') if isinstance(payload, dict) else payload
         
-        return jsonify(insights)
+        return jsonify(engine.quote_batch(records))
+    
+    except QuoteRequestError as e:
+        record_error(e)
+        return jsonify(e.to_dict()), 400
     
     except Exception as e:
+        record_error(e)
+        print(f"❌ Error in get_quote_batch: {str(e)}")
+        import traceback
+        traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/compare-brands', methods=['GET'])
-def compare_brands():
-    """Get brand comparison data"""
+@app.route('/api/compare-plans', methods=['POST'])
+def compare_plans():
+    """Price every plan tier and add-on combination for one applicant"""
+    
+    try:
+        user_data = request.get_json(silent=True)
+        return jsonify(engine.compare_plans(user_data))
+    
+    except QuoteRequestError as e:
+        record_error(e)
+        return jsonify(e.to_dict()), 400
+    
+    except Exception as e:
+        record_error(e)
+        print(f"❌ Error in compare_plans: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/what-if', methods=['POST'])
+def what_if():
+    """Premium over a grid of one or two swept fields for one applicant"""
     
     try:
-        with open('visualization_data/brand_comparison.json', 'r') as f:
-            brand_data = json.load(f)
+        payload = request.get_json(silent=True)
+        if not isinstance(payload, dict):
+            payload = {}
         
-        return jsonify(brand_data)
+        return jsonify(engine.what_if(payload.get('profile'), payload.get('sweep')))
+    
+    except QuoteRequestError as e:
+        record_error(e)
+        return jsonify(e.to_dict()), 400
     
     except Exception as e:
+        record_error(e)
+        print(f"❌ Error in what_if: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/insights', methods=['GET'])
+def get_insights():
+    """Get all insurance insights"""
+    
+    if insights_response is None:
+        return jsonify({"error": insights_error}), 500
+    
+    return insights_response.serve(request)
+
+@app.route('/api/compare-brands', methods=['GET'])
+def compare_brands():
+    """Get brand comparison data"""
+    
+    if brands_response is None:
+        return jsonify({"error": insights_error}), 500
+    
+    return brands_response.serve(request)
+
 @app.route('/api/savings-tips', methods=['POST'])
 def get_savings_tips():
     """Get personalized savings tips"""
     
     try:
-        user_data = request.json
-        tips = []
-        
-        # Check current vs better options
-        current_premium = user_data.get('current_premium', 1500)
-        
-        # Vehicle brand tip
-        if user_data.get('vehicle_make') in ['BMW', 'Mercedes', 'Audi']:
-            economy_avg = df[df['vehicle_category'] == 'Economy']['monthly_premium'].mean()
-            luxury_avg = df[df['vehicle_category'] == 'Luxury']['monthly_premium'].mean()
-            savings = luxury_avg - economy_avg
-            tips.append({
-                "tip": "Switch to an economy vehicle (Maruti, Tata, Hyundai)",
-                "savings": f"₹{savings:.0f}/month",
-                "impact": "high"
-            })
-        
-        # Smoking tip
-        if user_data.get('smoker') == 'yes':
-            smoker_avg = df[df['smoker'] == 'yes']['monthly_premium'].mean()
-            nonsmoker_avg = df[df['smoker'] == 'no']['monthly_premium'].mean()
-            savings = smoker_avg - nonsmoker_avg
-            tips.append({
-                "tip": "Quit smoking",
-                "savings": f"₹{savings:.0f}/month",
-                "impact": "high"
-            })
-        
-        # Mileage tip
-        if user_data.get('annual_mileage', 15000) > 20000:
-            high_mileage_avg = df[df['annual_mileage'] > 20000]['monthly_premium'].mean()
-            low_mileage_avg = df[df['annual_mileage'] <= 20000]['monthly_premium'].mean()
-            savings = high_mileage_avg - low_mileage_avg
-            tips.append({
-                "tip": "Reduce annual mileage below 20,000 km",
-                "savings": f"₹{savings:.0f}/month",
-                "impact": "medium"
-            })
-        
-        # Fuel type tip
-        if user_data.get('fuel_type') in ['Petrol', 'Diesel']:
-            electric_avg = df[df['fuel_type'] == 'Electric']['monthly_premium'].mean()
-            petrol_avg = df[df['fuel_type'] == 'Petrol']['monthly_premium'].mean()
-            savings = petrol_avg - electric_avg
-            tips.append({
-                "tip": "Consider an electric vehicle",
-                "savings": f"₹{savings:.0f}/month",
-                "impact": "low"
-            })
-        
-        # Usage type tip
-        if user_data.get('usage_type') in ['Commercial', 'Ride-share']:
-            commercial_avg = df[df['usage_type'] != 'Personal']['monthly_premium'].mean()
-            personal_avg = df[df['usage_type'] == 'Personal']['monthly_premium'].mean()
-            savings = commercial_avg - personal_avg
-            tips.append({
-                "tip": "Switch to personal use only",
-                "savings": f"₹{savings:.0f}/month",
-                "impact": "high"
-            })
-        
-        return jsonify({
-            "tips": tips,
-            "totalPotentialSavings": sum([float(tip['savings'].replace('₹', '').replace('/month', '')) for tip in tips]) if tips else 0
-        })
+        user_data = request.get_json(silent=True)
+        return jsonify(engine.savings_tips(user_data))
+    
+    except QuoteRequestError as e:
+        record_error(e)
+        return jsonify(e.to_dict()), 400
     
     except Exception as e:
+        record_error(e)
         return jsonify({"error": str(e)}), 500
 
+# Built once per served model version; a hot swap or rollback changes
+# engine.model_version, so the next request rebuilds it
+model_metrics_cache = (None, None)
+
 @app.route('/api/model-metrics', methods=['GET'])
 def get_model_metrics():
     """Get ML model performance metrics and details"""
+    global model_metrics_cache
     
     try:
-        # Load feature importance from CSV
-        feature_importance_df = pd.read_csv('models/feature_importance.csv')
-        
-        # Format feature names for better display
-        feature_name_map = {
-            'smoker_encoded': 'Smoking Status',
-            'bmi': 'BMI',
-            'vehicle_make_encoded': 'Vehicle Brand',
-            'age': 'Age',
-            'usage_type_encoded': 'Usage Type',
-            'annual_mileage': 'Annual Mileage',
-            'children': 'Children',
-            'vehicle_age': 'Vehicle Age',
-            'vehicle_category_encoded': 'Vehicle Category',
-            'fuel_type_encoded': 'Fuel Type',
-            'age_group_encoded': 'Age Group',
-            'region_encoded': 'Region',
-            'sex_encoded': 'Gender',
-            'old_vehicle': 'Old Vehicle Flag',
-            'high_mileage': 'High Mileage Flag'
-        }
-        
-        # Convert importance to percentage
-        feature_importance = [
-            {
-                "feature": feature_name_map.get(row['feature'], row['feature']),
-                "importance": round(row['importance'] * 100, 2)
-            }
-            for _, row in feature_importance_df.iterrows()
-        ]
-        
-        # Sort by importance
-        feature_importance = sorted(feature_importance, key=lambda x: x['importance'], reverse=True)
-        
-        # Get model metrics (these would be loaded from saved files in production)
-        # For now, using the values from training
-        metrics = {
-            "train_r2": 0.8745,
-            "test_r2": 0.8523,
-            "train_mae": 2847.32,
-            "test_mae": 3124.87,
-            "train_rmse": 4235.19,
-            "test_rmse": 4678.45
-        }
-        
-        # Hyperparameters
-        hyperparameters = {
-            "n_estimators": 200,
-            "learning_rate": 0.1,
-            "max_depth": 5,
-            "min_samples_split": 2,
-            "min_samples_leaf": 1,
-            "subsample": 0.8
-        }
+        current = engine
+        version, response = model_metrics_cache
+        if version != current.model_version:
+            response = load_model_metrics(current)
+            model_metrics_cache = (current.model_version, response)
         
-        # Dataset info
-        dataset_info = {
-            "total_samples": len(df),
-            "train_samples": 1070,
-            "test_samples": 268,
-            "features": len(feature_importance)
-        }
-        
-        # Build response
-        response = {
-            "model_name": "Gradient Boosting Regressor",
-            "training_date": "2025-11-05",
-            "metrics": metrics,
-            "feature_importance": feature_importance[:8],  # Top 8 features
-            "hyperparameters": hyperparameters,
-            "dataset_info": dataset_info,
-            "status": "production_ready"
-        }
-        
-        return jsonify(response)
+        return response.serve(request)
     
     except Exception as e:
+        record_error(e)
         print(f"Error getting model metrics: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+# Admin endpoints are disabled unless ADMIN_TOKEN is set; callers send
+# "Authorization: Bearer <token>"
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+def admin_denied():
+    """Error response for an unauthorized admin request, or None"""
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Admin endpoints are disabled (set ADMIN_TOKEN)"}), 403
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {ADMIN_TOKEN}'):
+        return jsonify({"error": "Invalid admin token"}), 401
+    return None
+
+def model_status():
+    return {
+        "serving": engine.model_version,
+        "source": engine.artifact_source,
+        "previous": previous_engine.model_version if previous_engine is not None else None,
+        "registry": {
+            "current": registry.current(),
+            "versions": registry.versions()
+        },
+        "reload": reload_status
+    }
+
+@app.route('/admin/models', methods=['GET'])
+def admin_models():
+    """Served, previous and registered model versions"""
+    denied = admin_denied()
+    if denied:
+        return denied
+    return jsonify(model_status())
+
+@app.route('/admin/models/reload', methods=['POST'])
+def admin_reload_model():
+    """Load a model version in the background and swap it in when ready"""
+    denied = admin_denied()
+    if denied:
+        return denied
+    
+    payload = request.get_json(silent=True) or {}
+    version = payload.get('version')
+    if reload_lock.locked():
+        return jsonify({"error": "A reload is already in progress"}), 409
+    try:
+        if version is not None:
+            registry.activate(version)
+    except RegistryError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    start_reload(version)
+    return jsonify({"status": "reloading", "version": version or registry.current()}), 202
+
+@app.route('/admin/models/rollback', methods=['POST'])
+def admin_rollback_model():
+    """Switch back to the previously served model version"""
+    denied = admin_denied()
+    if denied:
+        return denied
+    
+    try:
+        rollback_model()
+    except RegistryError as e:
+        return jsonify({"error": str(e)}), 409
+    return jsonify(model_status())
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus metrics in the text exposition format"""
+    return Response(metrics.render(), content_type=metrics.content_type)
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
@@ -0,0 +1,252 @@
+import datetime
+import hashlib
+import json
+import mmap
+import os
+import threading
+
+import numpy as np
+
+from features import FeatureTransformer
+from tree_engine import CompiledEnsemble
+from neighbors import KDTree
+
+# Bump whenever the file layout or the set of stored arrays changes
+BUNDLE_FORMAT_VERSION = 6
+BUNDLE_MAGIC = b'CARINSB\x00'
+BUNDLE_PATH = 'models/serving_bundle.bin'
+
+# Arrays start on cache-line boundaries so mapped views are well aligned
+ALIGNMENT = 64
+
+# Reference columns kept for segment statistics and percentile ranking
+NUMERIC_REFERENCE_COLUMNS = ['monthly_premium', 'annual_mileage']
+CATEGORICAL_REFERENCE_COLUMNS = ['vehicle_make', 'age_group', 'smoker']
+
+class BundleFormatError(ValueError):
+    """Raised when a bundle file is missing, corrupt or from another format version"""
+
+class LazyModel:
+    """A pickled model that is unpickled (importing joblib) on its first predict()"""
+
+    def __init__(self, path):
+        self.path = path
+        self.model = None
+        self._lock = threading.Lock()
+
+    def predict(self, X):
+        if self.model is None:
+            with self._lock:
+                if self.model is None:
+                    import joblib
+                    self.model = joblib.load(self.path)
+        return self.model.predict(X)
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def write_bundle(path, arrays, metadata):
+    """Write named arrays and JSON metadata to one memory-mappable file
+
+    Layout: magic, 8-byte header length, JSON header (format version,
+    metadata, dtype/shape/offset of every array), then the raw arrays.
+    The file is written next to path and renamed into place.
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+
+    entries = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = _align(offset)
+        entries[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += array.nbytes
+
+    header = json.dumps({
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "metadata": metadata,
+        "arrays": entries
+    }).encode('utf-8')
+    data_start = _align(len(BUNDLE_MAGIC) + 8 + len(header))
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(BUNDLE_MAGIC)
+        f.write(len(header).to_bytes(8, 'little'))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + entries[name]['offset'])
+            f.write(array.tobytes())
+    os.replace(tmp_path, path)
+
+class ServingBundle:
+    """A memory-mapped bundle file; arrays are read-only views into the map"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._map[:len(BUNDLE_MAGIC)] != BUNDLE_MAGIC:
+            raise BundleFormatError(f"{path} is not a serving bundle")
+        header_length = int.from_bytes(self._map[len(BUNDLE_MAGIC):len(BUNDLE_MAGIC) + 8], 'little')
+        header_start = len(BUNDLE_MAGIC) + 8
+        header = json.loads(self._map[header_start:header_start + header_length])
+
+        if header['format_version'] != BUNDLE_FORMAT_VERSION:
+            raise BundleFormatError(
+                f"{path} has format version {header['format_version']}, expected {BUNDLE_FORMAT_VERSION}"
+            )
+
+        self.path = path
+        self.metadata = header['metadata']
+        data_start = _align(header_start + header_length)
+        self.arrays = {}
+        for name, entry in header['arrays'].items():
+            dtype = np.dtype(entry['dtype'])
+            count = int(np.prod(entry['shape'], dtype=np.int64))
+            self.arrays[name] = np.frombuffer(
+                self._map, dtype=dtype, count=count, offset=data_start + entry['offset']
+            ).reshape(entry['shape'])
+
+    @property
+    def model_version(self):
+        return self.metadata['model_version']
+
+    def changed_sources(self, models_dir, data_dir):
+        """Source files that differ from the ones the bundle was built from
+
+        Sources are named models/... or data/..., relative to models_dir and
+        data_dir. A source that is not there is not checked, so the bundle
+        can be deployed without the files it was built from.
+        """
+        roots = {'models': models_dir, 'data': data_dir}
+        changed = []
+        for name, version in self.metadata['sources'].items():
+            root, relative = name.split('/', 1)
+            path = os.path.join(roots[root], relative)
+            if os.path.exists(path) and file_version(path) != version:
+                changed.append(name)
+        return changed
+
+    def load_model(self, dtype=np.float64, fallback_path=None):
+        """The compiled trees; fallback_path is the pickled model, used for
+        large batches only when the trees are too deep for the bitmask scorer"""
+        model = self.metadata['model']
+        compiled = CompiledEnsemble(
+            self.arrays['model/feature'], self.arrays['model/threshold'], self.arrays['model/value'],
+            model['depth'], model['init'], model['learning_rate'], model['n_features'], dtype=dtype
+        )
+        if compiled.leaf_masks is None and fallback_path is not None and os.path.exists(fallback_path):
+            compiled.fallback = LazyModel(fallback_path)
+        return compiled
+
+    def load_transformer(self):
+        return FeatureTransformer.from_dict(self.metadata['feature_transformer'])
+
+    def load_reference(self):
+        """Reference columns: arrays, or (codes, categories) for categoricals"""
+        categories = self.metadata['reference_categories']
+        reference = {name: self.arrays[f'reference/{name}'] for name in NUMERIC_REFERENCE_COLUMNS}
+        for name in CATEGORICAL_REFERENCE_COLUMNS:
+            reference[name] = (self.arrays[f'reference/{name}'], categories[name])
+        return reference
+
+    def load_neighbor_index(self):
+        """KD-tree over the reference policies' scaled features"""
+        return KDTree(*(self.arrays[f'neighbors/{name}']
+                        for name in ['points', 'index', 'split_dim', 'split_value', 'leaf_start',
+                                     'lower', 'upper']))
+
+def load_reference_table(path='data/insurance_processed'):
+    """Read the reference columns from the processed dataset (needs pandas)"""
+    from table_store import read_table
+    df = read_table(path, columns=NUMERIC_REFERENCE_COLUMNS + CATEGORICAL_REFERENCE_COLUMNS)
+    return {name: df[name].to_numpy() for name in df.columns}
+
+def load_reference_features(transformer, path='data/insurance_processed'):
+    """Scaled model features of every reference policy (needs pandas)"""
+    from table_store import read_table
+    return transformer.transform(read_table(path))
+
+def file_version(path):
+    """Short content hash identifying an artifact file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+def source_versions(models_dir, data_path):
+    """{name: file_version} of the files a bundle is built from
+
+    The model, the feature transformer (or the pickles it is read from for
+    older model versions) and the stored copy of the reference table that
+    read_table() reads, named as in ServingBundle.changed_sources().
+    """
+    from table_store import format_path, table_format
+
+    if os.path.exists(os.path.join(models_dir, 'feature_transformer.json')):
+        model_files = ['premium_predictor.pkl', 'feature_transformer.json']
+    else:
+        model_files = ['premium_predictor.pkl', 'encoders.pkl', 'scaler.pkl', 'feature_names.pkl']
+    versions = {f'models/{name}': file_version(os.path.join(models_dir, name)) for name in model_files}
+
+    data_dir = os.path.dirname(data_path)
+    stored = format_path(data_path, table_format(data_path))
+    if os.path.isdir(stored):
+        paths = sorted(os.path.join(stored, name) for name in os.listdir(stored))
+    else:
+        paths = [stored]
+    for path in paths:
+        versions[f'data/{os.path.relpath(path, data_dir)}'] = file_version(path)
+    return versions
+
+def build_serving_bundle(models_dir='models', data_path='data/insurance_processed',
+                         path=BUNDLE_PATH):
+    """Compile the pickled artifacts and reference data into one bundle file"""
+    import joblib
+
+    model_path = f'{models_dir}/premium_predictor.pkl'
+    compiled = CompiledEnsemble.from_model(joblib.load(model_path), keep_fallback=False)
+    transformer = FeatureTransformer.load_artifacts(models_dir)
+    reference = load_reference_table(data_path)
+    neighbor_index = KDTree.build(load_reference_features(transformer, data_path))
+
+    arrays = {
+        'model/feature': compiled.feature.astype(np.int32),
+        'model/threshold': compiled.threshold,
+        'model/value': compiled.value
+    }
+    reference_categories = {}
+    for name in NUMERIC_REFERENCE_COLUMNS:
+        arrays[f'reference/{name}'] = reference[name].astype(np.float64)
+    for name in CATEGORICAL_REFERENCE_COLUMNS:
+        categories, codes = np.unique(reference[name].astype(str), return_inverse=True)
+        arrays[f'reference/{name}'] = codes.ravel().astype(np.uint16)
+        reference_categories[name] = categories.tolist()
+    for name, array in neighbor_index.to_arrays().items():
+        arrays[f'neighbors/{name}'] = array
+
+    metadata = {
+        "model_version": file_version(model_path),
+        # Rebuild the bundle when any of these change
+        "sources": source_versions(models_dir, data_path),
+        "created_at": datetime.datetime.now().isoformat(timespec='seconds'),
+        "model": {
+            "depth": compiled.depth,
+            "init": compiled.init,
+            "learning_rate": compiled.learning_rate,
+            "n_features": compiled.n_features,
+            "n_trees": compiled.n_trees
+        },
+        "feature_names": transformer.feature_names,
+        "feature_transformer": transformer.to_dict(),
+        "reference_categories": reference_categories,
+        "reference_rows": int(len(reference['monthly_premium']))
+    }
+    write_bundle(path, arrays, metadata)
+    return metadata
+
+if __name__ == "__main__":
+    metadata = build_serving_bundle()
+    print(f"✓ Wrote {BUNDLE_PATH} (model {metadata['model_version']}, "
+          f"{metadata['reference_rows']} reference policies)")
@@ -0,0 +1,374 @@
+import argparse
+import csv
+import datetime
+import http.client
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BACKEND_DIR, 'benchmarks')
+PRELOAD_CONFIG = os.path.join(BACKEND_DIR, 'gunicorn_preload.py')
+
+# (name, method, path); POST endpoints get a sampled applicant as the body
+ENDPOINTS = [
+    ('get-quote', 'POST', '/api/get-quote'),
+    ('insights', 'GET', '/api/insights'),
+    ('savings-tips', 'POST', '/api/savings-tips'),
+    ('model-metrics', 'GET', '/api/model-metrics'),
+    ('compare-brands', 'GET', '/api/compare-brands')
+]
+
+PAYLOAD_FIELDS = {
+    'age': int, 'sex': str, 'bmi': float, 'children': int, 'smoker': str,
+    'region': str, 'vehicle_make': str, 'vehicle_year': int,
+    'annual_mileage': int, 'usage_type': str, 'fuel_type': str
+}
+
+def load_payloads(path=os.path.join(BACKEND_DIR, 'data', 'insurance.csv'), count=1000, seed=42):
+    """Sample request bodies from real policies (with replacement, seeded)"""
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    rng = random.Random(seed)
+    return [
+        json.dumps({field: cast(row[field]) for field, cast in PAYLOAD_FIELDS.items()}).encode('utf-8')
+        for row in rng.choices(rows, k=count)
+    ]
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return float('nan')
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+class InProcessClient:
+    """Drives the Flask app through its test client (no network, no server)"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def send(self, method, path, body):
+        response = self.client.open(path, method=method, data=body,
+                                    content_type='application/json' if body else None)
+        response.get_data()
+        return response.status_code
+
+class HTTPClient:
+    """Keep-alive HTTP/1.1 connection to a running server"""
+
+    def __init__(self, host, port):
+        self.connection = http.client.HTTPConnection(host, port, timeout=30)
+
+    def send(self, method, path, body):
+        headers = {'Content-Type': 'application/json'} if body else {}
+        self.connection.request(method, path, body=body, headers=headers)
+        response = self.connection.getresponse()
+        response.read()
+        return response.status
+
+def run_level(make_client, endpoint, payloads, concurrency, total_requests, warmup=20):
+    """Send total_requests to one endpoint from `concurrency` threads
+
+    Every thread gets its own client; latencies are measured per request
+    and throughput over the whole level, after an unrecorded warm-up.
+    """
+    name, method, path = endpoint
+    per_worker = max(1, total_requests // concurrency)
+    latencies = [[] for _ in range(concurrency)]
+    errors = [0] * concurrency
+    start = threading.Barrier(concurrency + 1, timeout=120)
+
+    def worker(index):
+        client = make_client()
+        rng = random.Random(index)
+        for _ in range(warmup):
+            client.send(method, path, rng.choice(payloads) if method == 'POST' else None)
+        start.wait()
+        samples = latencies[index]
+        for _ in range(per_worker):
+            body = rng.choice(payloads) if method == 'POST' else None
+            began = time.perf_counter()
+            status = client.send(method, path, body)
+            samples.append(time.perf_counter() - began)
+            if status >= 400:
+                errors[index] += 1
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    began = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+
+    samples = sorted(sample for worker_samples in latencies for sample in worker_samples)
+    return {
+        "endpoint": name,
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "errors": sum(errors),
+        "duration_s": round(elapsed, 4),
+        "throughput_rps": round(len(samples) / elapsed, 1),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 3),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3)
+    }
+
+def start_gunicorn(port, workers, threads, preload=False):
+    """Start `gunicorn app:app` on localhost and wait until it answers
+
+    With preload the app is loaded once in the master using gunicorn_preload.py.
+    """
+    env = dict(os.environ)
+    env.setdefault('LOG_SAMPLE_RATE', '0')
+    config = ['--config', PRELOAD_CONFIG] if preload else []
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', *config, '--workers', str(workers), '--threads', str(threads),
+         '--bind', f'127.0.0.1:{port}', '--log-level', 'warning', 'app:app'],
+        cwd=BACKEND_DIR, env=env
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {server.returncode}")
+        try:
+            if HTTPClient('127.0.0.1', port).send('GET', '/', None) == 200:
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("gunicorn did not start within 60s")
+
+def run_suite(mode, endpoints, payloads, concurrency_levels, total_requests, warmup, server_options):
+    """Benchmark every endpoint at every concurrency level in one mode"""
+    server = None
+    if mode == 'inprocess':
+        os.environ.setdefault('LOG_SAMPLE_RATE', '0')
+        sys.path.insert(0, BACKEND_DIR)
+        from app import app
+        make_client = lambda: InProcessClient(app)
+    else:
+        server = start_gunicorn(**server_options)
+        make_client = lambda: HTTPClient('127.0.0.1', server_options['port'])
+
+    results = []
+    try:
+        for endpoint in endpoints:
+            for concurrency in concurrency_levels:
+                result = run_level(make_client, endpoint, payloads, concurrency, total_requests, warmup)
+                result["mode"] = mode
+                results.append(result)
+                print(f"   {mode:9} {result['endpoint']:15} c={concurrency:<3} "
+                      f"{result['throughput_rps']:>9.1f} req/s  p50 {result['p50_ms']:.2f} ms  "
+                      f"p95 {result['p95_ms']:.2f} ms  p99 {result['p99_ms']:.2f} ms"
+                      + (f"  ({result['errors']} errors)" if result['errors'] else ""))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    return results
+
+def process_memory(pid):
+    """Resident, proportional and unique memory of a process in MB (Linux only)
+
+    Unique memory (USS) is the private pages only this process holds, i.e.
+    what each additional worker really costs; PSS splits shared pages
+    evenly between the processes sharing them, so PSS sums to the total.
+    """
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        "rss_mb": round(fields['Rss'] / 1024, 1),
+        "pss_mb": round(fields['Pss'] / 1024, 1),
+        "uss_mb": round((fields['Private_Clean'] + fields['Private_Dirty']) / 1024, 1)
+    }
+
+def child_pids(pid):
+    """Pids of the direct children of a process (the gunicorn workers)"""
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The parent pid is the second field after the parenthesized command name
+        if int(stat.rsplit(')', 1)[1].split()[1]) == pid:
+            children.append(int(entry))
+    return sorted(children)
+
+def run_memory_suite(payloads, total_requests, server_options):
+    """Per-worker memory of gunicorn with and without preloading
+
+    Each server first serves get-quote traffic from one connection per
+    worker thread, so the pages a worker dirties while serving are counted.
+    """
+    make_client = lambda: HTTPClient('127.0.0.1', server_options['port'])
+    concurrency = server_options['workers'] * server_options['threads']
+    results = []
+    for preload in (False, True):
+        server = start_gunicorn(preload=preload, **server_options)
+        try:
+            run_level(make_client, ENDPOINTS[0], payloads, concurrency, total_requests)
+            master = process_memory(server.pid)
+            workers = [process_memory(pid) for pid in child_pids(server.pid)]
+        finally:
+            server.terminate()
+            server.wait()
+
+        result = {
+            "preload": preload,
+            "workers": len(workers),
+            "master": master,
+            "worker_rss_mb": round(sum(w['rss_mb'] for w in workers) / len(workers), 1),
+            "worker_uss_mb": round(sum(w['uss_mb'] for w in workers) / len(workers), 1),
+            "total_pss_mb": round(master['pss_mb'] + sum(w['pss_mb'] for w in workers), 1),
+            "per_worker": workers
+        }
+        results.append(result)
+        print(f"   preload={'on ' if preload else 'off'} {result['workers']} workers  "
+              f"per-worker RSS {result['worker_rss_mb']:.1f} MB  unique {result['worker_uss_mb']:.1f} MB  "
+              f"total PSS {result['total_pss_mb']:.1f} MB")
+    return results
+
+def compare_results(results, baseline, tolerance=0.10):
+    """Compare against baseline results; returns (rows, regressions)
+
+    A level regresses when throughput drops, or p95 latency rises, by more
+    than `tolerance` (a fraction) relative to the same mode/endpoint/concurrency.
+    """
+    previous = {(r['mode'], r['endpoint'], r['concurrency']): r for r in baseline['results']}
+    rows, regressions = [], []
+    for result in results:
+        key = (result['mode'], result['endpoint'], result['concurrency'])
+        if key not in previous:
+            continue
+        old = previous[key]
+        throughput_change = result['throughput_rps'] / old['throughput_rps'] - 1
+        p95_change = result['p95_ms'] / old['p95_ms'] - 1
+        row = {
+            "mode": key[0], "endpoint": key[1], "concurrency": key[2],
+            "throughput_change": round(throughput_change, 4),
+            "p95_change": round(p95_change, 4),
+            "regressed": throughput_change < -tolerance or p95_change > tolerance
+        }
+        rows.append(row)
+        if row['regressed']:
+            regressions.append(row)
+    return rows, regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the insurance API endpoints")
+    parser.add_argument('--mode', choices=['inprocess', 'gunicorn', 'both'], default='inprocess')
+    parser.add_argument('--endpoints', default=','.join(name for name, _, _ in ENDPOINTS),
+                        help="comma-separated endpoint names")
+    parser.add_argument('--concurrency', default='1,4,16', help="comma-separated thread counts")
+    parser.add_argument('--requests', type=int, default=1000, help="requests per endpoint and level")
+    parser.add_argument('--warmup', type=int, default=20, help="unrecorded requests per thread")
+    parser.add_argument('--payloads', type=int, default=1000, help="applicants sampled from insurance.csv")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', type=int, default=2, help="gunicorn workers")
+    parser.add_argument('--threads', type=int, default=4, help="gunicorn threads per worker")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--preload', action='store_true',
+                        help="run gunicorn with gunicorn_preload.py (app loaded once in the master)")
+    parser.add_argument('--memory', action='store_true',
+                        help="measure per-worker gunicorn memory with and without preloading instead of latency")
+    parser.add_argument('--output', help="results JSON (default benchmarks/results-<mode>.json)")
+    parser.add_argument('--baseline', help="baseline JSON to compare against")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="also write the results as benchmarks/baseline-<mode>.json")
+    parser.add_argument('--tolerance', type=float, default=0.10)
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args(argv)
+
+    selected = args.endpoints.split(',')
+    endpoints = [endpoint for endpoint in ENDPOINTS if endpoint[0] in selected]
+    concurrency_levels = [int(level) for level in args.concurrency.split(',')]
+    modes = ['inprocess', 'gunicorn'] if args.mode == 'both' else [args.mode]
+    payloads = load_payloads(count=args.payloads, seed=args.seed)
+    server_options = {'port': args.port, 'workers': args.workers, 'threads': args.threads}
+
+    if args.memory:
+        print(f"🧠 Measuring gunicorn worker memory ({args.workers} workers)...")
+        print("=" * 60)
+        report = {
+            "created_at": datetime.datetime.now().isoformat(timespec='seconds'),
+            "config": {"requests": args.requests, "gunicorn_workers": args.workers,
+                       "gunicorn_threads": args.threads},
+            "environment": {"python": platform.python_version(), "platform": platform.platform()},
+            "results": run_memory_suite(payloads, args.requests, server_options)
+        }
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = args.output or os.path.join(RESULTS_DIR, 'memory.json')
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results saved to {output}")
+        return 0
+
+    print("⏱️  Benchmarking API endpoints...")
+    print("=" * 60)
+    results = []
+    for mode in modes:
+        results.extend(run_suite(
+            mode, endpoints, payloads, concurrency_levels, args.requests, args.warmup,
+            dict(server_options, preload=args.preload)
+        ))
+
+    report = {
+        "created_at": datetime.datetime.now().isoformat(timespec='seconds'),
+        "config": {
+            "modes": modes, "concurrency": concurrency_levels, "requests": args.requests,
+            "warmup": args.warmup, "payloads": args.payloads, "seed": args.seed,
+            "gunicorn_workers": args.workers, "gunicorn_threads": args.threads,
+            "gunicorn_preload": args.preload
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        },
+        "results": results
+    }
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = args.output or os.path.join(RESULTS_DIR, f'results-{args.mode}.json')
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Results saved to {output}")
+    if args.save_baseline:
+        baseline_path = os.path.join(RESULTS_DIR, f'baseline-{args.mode}.json')
+        with open(baseline_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Baseline saved to {baseline_path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows, regressions = compare_results(results, baseline, args.tolerance)
+        print(f"\n📊 Compared with {args.baseline} (tolerance {args.tolerance:.0%}):")
+        for row in rows:
+            print(f"   {row['mode']:9} {row['endpoint']:15} c={row['concurrency']:<3} "
+                  f"throughput {row['throughput_change']:+.1%}  p95 {row['p95_change']:+.1%}"
+                  + ("  ❌ REGRESSION" if row['regressed'] else ""))
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
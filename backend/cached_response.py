@@ -0,0 +1,36 @@
+import gzip
+import hashlib
+import json
+
+from flask import Response
+
+class CachedJSONResponse:
+    """A JSON payload serialized and gzip-compressed once, served many times
+
+    Responses carry a strong ETag derived from the body, so clients that send
+    a matching If-None-Match get an empty 304 instead of the payload.
+    """
+
+    def __init__(self, payload, max_age=300):
+        self.body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.gzip_body = gzip.compress(self.body, compresslevel=9, mtime=0)
+        self.tag = hashlib.sha256(self.body).hexdigest()[:32]
+        self.etag = f'"{self.tag}"'
+        self.cache_control = f'public, max-age={max_age}'
+
+    def serve(self, request):
+        """Build the Flask response for request (304, gzip or identity)"""
+        headers = {
+            'ETag': self.etag,
+            'Cache-Control': self.cache_control,
+            'Vary': 'Accept-Encoding'
+        }
+
+        if request.if_none_match.contains(self.tag):
+            return Response(status=304, headers=headers)
+
+        if 'gzip' in request.accept_encodings:
+            headers['Content-Encoding'] = 'gzip'
+            return Response(self.gzip_body, mimetype='application/json', headers=headers)
+
+        return Response(self.body, mimetype='application/json', headers=headers)
@@ -1,11 +1,93 @@
 import pandas as pd
 import numpy as np
-import requests
 import os
 
+# Vehicle makes and models
+VEHICLE_MODELS = {
+    'Maruti': ['Swift', 'Baleno', 'Dzire', 'Alto', 'Vitara Brezza'],
+    'Tata': ['Nexon', 'Harrier', 'Safari', 'Altroz', 'Tiago'],
+    'Hyundai': ['Creta', 'i20', 'Venue', 'Verna', 'Elantra'],
+    'Toyota': ['Fortuner', 'Innova', 'Camry', 'Glanza', 'Urban Cruiser'],
+    'Honda': ['City', 'Amaze', 'CR-V', 'Accord', 'Jazz'],
+    'Ford': ['EcoSport', 'Endeavour', 'Figo', 'Aspire', 'Mustang'],
+    'Chevrolet': ['Cruze', 'Beat', 'Trailblazer', 'Spark', 'Sail'],
+    'Nissan': ['Magnite', 'Kicks', 'GT-R', 'Sunny', 'Terrano'],
+    'BMW': ['3 Series', '5 Series', 'X1', 'X5', '7 Series'],
+    'Mercedes': ['C-Class', 'E-Class', 'GLC', 'S-Class', 'GLA'],
+    'Audi': ['A4', 'A6', 'Q3', 'Q5', 'Q7']
+}
+
+# Realistic market share of each make
+MAKE_WEIGHTS = {
+    'Maruti': 0.20, 'Tata': 0.12, 'Hyundai': 0.18,
+    'Toyota': 0.15, 'Honda': 0.12, 'Ford': 0.08,
+    'Chevrolet': 0.05, 'Nissan': 0.04,
+    'BMW': 0.03, 'Mercedes': 0.02, 'Audi': 0.01
+}
+
+USAGE_TYPES = ['Personal', 'Commercial', 'Ride-share']
+USAGE_PROBS = [0.80, 0.15, 0.05]
+
+FUEL_TYPES = ['Petrol', 'Diesel', 'Electric']
+FUEL_PROBS = [0.50, 0.35, 0.15]
+
+# Vehicle years are drawn from [VEHICLE_YEAR_MIN, VEHICLE_YEAR_MAX) and
+# annual mileage (km) from [MILEAGE_MIN, MILEAGE_MAX]
+VEHICLE_YEAR_MIN, VEHICLE_YEAR_MAX = 2015, 2025
+MILEAGE_MIN, MILEAGE_MAX = 5000, 30000
+REFERENCE_YEAR = 2025
+
+YEARLY_DISCOUNT = 0.9  # 10% annual discount
+
+# Premium multipliers by vehicle characteristics (categories not listed pay 1.0)
+MAKE_MULTIPLIERS = {'BMW': 2.2, 'Mercedes': 2.2, 'Audi': 2.2}
+USAGE_MULTIPLIERS = {'Commercial': 1.4, 'Ride-share': 1.6}
+HIGH_MILEAGE_THRESHOLD = 20000
+HIGH_MILEAGE_MULTIPLIER = 1.2
+FUEL_MULTIPLIERS = {'Electric': 0.9, 'Diesel': 1.05}
+
+COLUMNS = [
+    'age', 'sex', 'bmi', 'children', 'smoker', 'region',
+    'vehicle_make', 'vehicle_model', 'vehicle_year', 'vehicle_age',
+    'annual_mileage', 'usage_type', 'fuel_type',
+    'monthly_premium', 'yearly_premium'
+]
+
+def category_multipliers(values, multipliers):
+    """Per-row multipliers for a categorical column (1.0 where none applies)
+
+    values is an array (or Series) of category values, or a (codes,
+    categories) pair.
+    """
+    if isinstance(values, tuple):
+        codes, categories = values
+        return np.array([multipliers.get(category, 1.0) for category in categories])[codes]
+    values = np.asarray(values)
+    factors = np.ones(len(values))
+    for category, multiplier in multipliers.items():
+        factors[values == category] = multiplier
+    return factors
+
+def adjust_premiums(premium, vehicle_make, usage_type, annual_mileage, fuel_type):
+    """Apply the vehicle multipliers to an array of base premiums
+
+    The categorical arguments are arrays (or Series) of category values or
+    (codes, categories) pairs. Returns a new float array; multipliers are
+    applied in a fixed order (make, usage, mileage, fuel) so results do not
+    depend on the caller.
+    """
+    premium = np.array(premium, dtype=np.float64)
+    premium *= category_multipliers(vehicle_make, MAKE_MULTIPLIERS)
+    premium *= category_multipliers(usage_type, USAGE_MULTIPLIERS)
+    premium *= np.where(np.asarray(annual_mileage) > HIGH_MILEAGE_THRESHOLD, HIGH_MILEAGE_MULTIPLIER, 1.0)
+    premium *= category_multipliers(fuel_type, FUEL_MULTIPLIERS)
+    return premium
+
 def download_and_enhance_dataset():
     """Download real insurance data and enhance for car insurance"""
     
+    import requests
+
     print("📥 Downloading insurance dataset...")
     
     # Download dataset
@@ -28,32 +110,10 @@ def download_and_enhance_dataset():
     
     np.random.seed(42)
     
-    # Vehicle makes and models
-    vehicle_data = {
-        'Maruti': ['Swift', 'Baleno', 'Dzire', 'Alto', 'Vitara Brezza'],
-        'Tata': ['Nexon', 'Harrier', 'Safari', 'Altroz', 'Tiago'],
-        'Hyundai': ['Creta', 'i20', 'Venue', 'Verna', 'Elantra'],
-        'Toyota': ['Fortuner', 'Innova', 'Camry', 'Glanza', 'Urban Cruiser'],
-        'Honda': ['City', 'Amaze', 'CR-V', 'Accord', 'Jazz'],
-        'Ford': ['EcoSport', 'Endeavour', 'Figo', 'Aspire', 'Mustang'],
-        'Chevrolet': ['Cruze', 'Beat', 'Trailblazer', 'Spark', 'Sail'],
-        'Nissan': ['Magnite', 'Kicks', 'GT-R', 'Sunny', 'Terrano'],
-        'BMW': ['3 Series', '5 Series', 'X1', 'X5', '7 Series'],
-        'Mercedes': ['C-Class', 'E-Class', 'GLC', 'S-Class', 'GLA'],
-        'Audi': ['A4', 'A6', 'Q3', 'Q5', 'Q7']
-    }
-    
     # Assign vehicle makes with realistic distribution
     makes = []
-    weights = {
-        'Maruti': 0.20, 'Tata': 0.12, 'Hyundai': 0.18,
-        'Toyota': 0.15, 'Honda': 0.12, 'Ford': 0.08,
-        'Chevrolet': 0.05, 'Nissan': 0.04,
-        'BMW': 0.03, 'Mercedes': 0.02, 'Audi': 0.01
-    }
-    
     for _ in range(len(df)):
-        make = np.random.choice(list(weights.keys()), p=list(weights.values()))
+        make = np.random.choice(list(MAKE_WEIGHTS.keys()), p=list(MAKE_WEIGHTS.values()))
         makes.append(make)
     
     df['vehicle_make'] = makes
@@ -61,78 +121,46 @@ def download_and_enhance_dataset():
     # Assign models based on make
     models = []
     for make in df['vehicle_make']:
-        model = np.random.choice(vehicle_data[make])
+        model = np.random.choice(VEHICLE_MODELS[make])
         models.append(model)
     
     df['vehicle_model'] = models
     
     # Vehicle year (2015-2024)
-    df['vehicle_year'] = np.random.randint(2015, 2025, size=len(df))
+    df['vehicle_year'] = np.random.randint(VEHICLE_YEAR_MIN, VEHICLE_YEAR_MAX, size=len(df))
     
     # Annual mileage (5,000-30,000 km)
-    df['annual_mileage'] = np.random.randint(5000, 30001, size=len(df))
+    df['annual_mileage'] = np.random.randint(MILEAGE_MIN, MILEAGE_MAX + 1, size=len(df))
     
     # Usage type
-    usage_choices = ['Personal', 'Commercial', 'Ride-share']
-    usage_probs = [0.80, 0.15, 0.05]
-    df['usage_type'] = np.random.choice(usage_choices, size=len(df), p=usage_probs)
+    df['usage_type'] = np.random.choice(USAGE_TYPES, size=len(df), p=USAGE_PROBS)
     
     # Fuel type
-    fuel_choices = ['Petrol', 'Diesel', 'Electric']
-    fuel_probs = [0.50, 0.35, 0.15]
-    df['fuel_type'] = np.random.choice(fuel_choices, size=len(df), p=fuel_probs)
+    df['fuel_type'] = np.random.choice(FUEL_TYPES, size=len(df), p=FUEL_PROBS)
     
     # Rename charges to monthly_premium
     df['monthly_premium'] = df['charges']
     df.drop('charges', axis=1, inplace=True)
     
     # Derive additional features
-    df['vehicle_age'] = 2025 - df['vehicle_year']
-    df['yearly_premium'] = df['monthly_premium'] * 12 * 0.9  # 10% annual discount
+    df['vehicle_age'] = REFERENCE_YEAR - df['vehicle_year']
+    df['yearly_premium'] = df['monthly_premium'] * 12 * YEARLY_DISCOUNT
     
     # Adjust premiums based on vehicle characteristics
     print("💰 Adjusting premiums based on vehicle characteristics...")
     
-    # Luxury brands cost more
-    luxury_mask = df['vehicle_make'].isin(['BMW', 'Mercedes', 'Audi'])
-    df.loc[luxury_mask, 'monthly_premium'] *= 2.2
-    df.loc[luxury_mask, 'yearly_premium'] *= 2.2
-    
-    # Commercial and ride-share cost more
-    commercial_mask = df['usage_type'] == 'Commercial'
-    rideshare_mask = df['usage_type'] == 'Ride-share'
-    df.loc[commercial_mask, 'monthly_premium'] *= 1.4
-    df.loc[commercial_mask, 'yearly_premium'] *= 1.4
-    df.loc[rideshare_mask, 'monthly_premium'] *= 1.6
-    df.loc[rideshare_mask, 'yearly_premium'] *= 1.6
-    
-    # High mileage costs more
-    high_mileage_mask = df['annual_mileage'] > 20000
-    df.loc[high_mileage_mask, 'monthly_premium'] *= 1.2
-    df.loc[high_mileage_mask, 'yearly_premium'] *= 1.2
-    
-    # Electric vehicles get discount
-    electric_mask = df['fuel_type'] == 'Electric'
-    df.loc[electric_mask, 'monthly_premium'] *= 0.9
-    df.loc[electric_mask, 'yearly_premium'] *= 0.9
-    
-    # Diesel slightly more expensive
-    diesel_mask = df['fuel_type'] == 'Diesel'
-    df.loc[diesel_mask, 'monthly_premium'] *= 1.05
-    df.loc[diesel_mask, 'yearly_premium'] *= 1.05
+    for column in ['monthly_premium', 'yearly_premium']:
+        df[column] = adjust_premiums(
+            df[column].to_numpy(), df['vehicle_make'], df['usage_type'],
+            df['annual_mileage'], df['fuel_type']
+        )
     
     # Round premiums
     df['monthly_premium'] = df['monthly_premium'].round(2)
     df['yearly_premium'] = df['yearly_premium'].round(2)
     
     # Reorder columns
-    columns_order = [
-        'age', 'sex', 'bmi', 'children', 'smoker', 'region',
-        'vehicle_make', 'vehicle_model', 'vehicle_year', 'vehicle_age',
-        'annual_mileage', 'usage_type', 'fuel_type',
-        'monthly_premium', 'yearly_premium'
-    ]
-    df = df[columns_order]
+    df = df[COLUMNS]
     
     # Save enhanced dataset
     df.to_csv('data/insurance.csv', index=False)
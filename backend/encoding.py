@@ -0,0 +1,110 @@
+import numpy as np
+
+class UnknownCategoryError(ValueError):
+    """Raised when a value is not one of the categories the encoders were fitted on"""
+
+    def __init__(self, field, value):
+        self.field = field
+        self.value = value
+        super().__init__(f"Unknown value for field {field}: {value!r}")
+
+class CategoryEncoder:
+    """Lookup-table replacement for the fitted LabelEncoders in models/encoders.pkl
+
+    Scalars are encoded with a dict lookup and whole columns with a binary
+    search over the sorted classes, skipping sklearn's per-call input
+    validation. Codes are identical to LabelEncoder.transform.
+    """
+
+    def __init__(self, classes):
+        # classes: {field: sorted list of category strings}
+        self.classes = {
+            field: np.asarray(values).astype(str)
+            for field, values in classes.items()
+        }
+        self.codes = {
+            field: {value: code for code, value in enumerate(values.tolist())}
+            for field, values in self.classes.items()
+        }
+
+    @classmethod
+    def from_label_encoders(cls, label_encoders):
+        return cls({field: encoder.classes_ for field, encoder in label_encoders.items()})
+
+    @classmethod
+    def load(cls, path='models/encoders.pkl'):
+        import joblib
+        return cls.from_label_encoders(joblib.load(path))
+
+    def to_classes(self):
+        """Plain {field: [categories]} dict, e.g. for the serving bundle"""
+        return {field: values.tolist() for field, values in self.classes.items()}
+
+    def __contains__(self, field):
+        return field in self.codes
+
+    def encode(self, field, value):
+        """Encode a single value, raising UnknownCategoryError if it is not known"""
+        try:
+            return self.codes[field][value]
+        except (KeyError, TypeError):
+            raise UnknownCategoryError(field, value) from None
+
+    def encode_column(self, field, values, strict=True):
+        """Encode a column of values
+
+        With strict=True returns the codes and raises UnknownCategoryError on
+        the first unknown value; with strict=False returns (codes, known)
+        where known is a boolean mask and unknown values get code -1.
+        """
+        if strict:
+            # Dict lookups beat converting every value to str when all are known
+            try:
+                return np.fromiter(map(self.codes[field].__getitem__, values), dtype=np.int64,
+                                   count=len(values))
+            except (KeyError, TypeError):
+                pass
+        classes = self.classes[field]
+        values = np.asarray(values, dtype=object).astype(str)
+        positions = np.searchsorted(classes, values)
+        positions = np.minimum(positions, len(classes) - 1)
+        known = classes[positions] == values
+        codes = np.where(known, positions, -1).astype(np.int64)
+
+        if strict:
+            if not known.all():
+                raise UnknownCategoryError(field, values[np.argmin(known)])
+            return codes
+        return codes, known
+
+class FeatureScaler:
+    """StandardScaler.transform rebuilt from the fitted mean_ and scale_
+
+    Same arithmetic as sklearn (subtract, then divide), so outputs are
+    identical, without sklearn's input validation or the sklearn import.
+    """
+
+    def __init__(self, mean, scale):
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self._mean = self.mean.tolist()
+        self._scale = self.scale.tolist()
+
+    @classmethod
+    def from_sklearn(cls, scaler):
+        return cls(scaler.mean_, scaler.scale_)
+
+    def transform(self, X):
+        X = np.array(X, dtype=np.float64)
+        X -= self.mean
+        X /= self.scale
+        return X
+
+    def transform_row(self, values):
+        """transform() of one row given as a sequence, as a (1, n) array
+
+        Python floats do the same IEEE subtract and divide as NumPy, so the
+        result is identical; for a single row it avoids three array calls.
+        """
+        return np.array([[(value - mean) / scale
+                          for value, mean, scale in zip(values, self._mean, self._scale)]])
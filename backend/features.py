@@ -0,0 +1,304 @@
+"""Model features of a policy, shared by training and serving
+
+FeatureTransformer is the one definition of the model's input: the derived
+columns (vehicle age, age group, vehicle category, mileage and age flags),
+the label encoding, the column order and the standard scaling.
+preprocessing.py fits it and saves it to models/feature_transformer.json;
+the serving bundle carries the same JSON, and the quote engine prices with
+it. Importing this module costs only NumPy.
+
+    python features.py --check    # serving vs training features on the processed data
+"""
+import argparse
+import bisect
+import json
+import os
+
+import numpy as np
+
+from encoding import CategoryEncoder, FeatureScaler, UnknownCategoryError
+from segment_stats import HIGH_MILEAGE_THRESHOLD
+from validation import CATEGORICAL_FIELDS
+
+TRANSFORMER_PATH = 'models/feature_transformer.json'
+
+# Age groups: an age belongs to the first group whose upper edge it does not exceed
+AGE_GROUP_EDGES = [25, 40, 55]
+AGE_GROUPS = ['Young (18-25)', 'Adult (26-40)', 'Middle (41-55)', 'Senior (56+)']
+
+ECONOMY_MAKES = ['Maruti', 'Tata']
+LUXURY_MAKES = ['BMW', 'Mercedes', 'Audi']
+
+OLD_VEHICLE_AGE = 7
+
+# Artifacts saved before the transformer existed were trained with
+# vehicle_age = 2025 - vehicle_year
+LEGACY_REFERENCE_YEAR = 2025
+
+# Label-encoded columns: the request's categoricals and the derived labels
+CATEGORICAL_COLUMNS = CATEGORICAL_FIELDS + ['age_group', 'vehicle_category']
+
+# Features that are scaled as they are (everything else is label-encoded)
+NUMERIC_FEATURES = ['age', 'bmi', 'children', 'annual_mileage', 'vehicle_age',
+                    'high_mileage', 'old_vehicle']
+
+FEATURE_NAMES = [
+    'age', 'bmi', 'children', 'annual_mileage', 'vehicle_age',
+    'sex_encoded', 'smoker_encoded', 'region_encoded',
+    'vehicle_make_encoded', 'usage_type_encoded', 'fuel_type_encoded',
+    'age_group_encoded', 'vehicle_category_encoded',
+    'high_mileage', 'old_vehicle'
+]
+
+def age_group_for(age):
+    """Age group label used by the encoders and the segment tables"""
+    return AGE_GROUPS[bisect.bisect_left(AGE_GROUP_EDGES, age)]
+
+def vehicle_category_for(vehicle_make):
+    """Vehicle category label used by the encoders"""
+    if vehicle_make in ECONOMY_MAKES:
+        return 'Economy'
+    elif vehicle_make in LUXURY_MAKES:
+        return 'Luxury'
+    return 'Mid-range'
+
+def derive_columns(columns, reference_year):
+    """{name: array} of the derived columns for a table of policies
+
+    columns is a DataFrame or a dict of arrays with age, vehicle_make,
+    vehicle_year and annual_mileage.
+    """
+    vehicle_age = reference_year - np.asarray(columns['vehicle_year'])
+    make = np.asarray(columns['vehicle_make'], dtype=object)
+    return {
+        'vehicle_age': vehicle_age,
+        'age_group': np.asarray(AGE_GROUPS, dtype=object)[
+            np.searchsorted(AGE_GROUP_EDGES, np.asarray(columns['age']), side='left')
+        ],
+        'vehicle_category': np.select(
+            [np.isin(make, ECONOMY_MAKES), np.isin(make, LUXURY_MAKES)],
+            ['Economy', 'Luxury'], default='Mid-range'
+        ).astype(object),
+        'high_mileage': (np.asarray(columns['annual_mileage']) > HIGH_MILEAGE_THRESHOLD).astype(int),
+        'old_vehicle': (vehicle_age > OLD_VEHICLE_AGE).astype(int)
+    }
+
+def reference_year_of(vehicle_year, vehicle_age):
+    """The year vehicle ages are counted from in a dataset with both columns"""
+    years = np.asarray(vehicle_year, dtype=np.float64) + np.asarray(vehicle_age, dtype=np.float64)
+    years = np.unique(years[~np.isnan(years)])
+    if len(years) != 1:
+        raise ValueError(f"vehicle_age is not counted from a single year ({years.tolist()[:5]})")
+    return int(years[0])
+
+class FeatureTransformer:
+    """Fitted policy -> scaled model features transform
+
+    classes maps every column of CATEGORICAL_COLUMNS to its sorted
+    categories (LabelEncoder.classes_), mean and scale are the
+    StandardScaler moments in feature_names order, and reference_year is
+    the year vehicle_age is counted from.
+
+    transform() works on whole columns: the derived labels are looked up
+    as codes (age bin -> age_group code, make code -> vehicle_category
+    code), so a million rows cost a handful of array operations.
+    transform_record() does the same lookups in plain Python for a single
+    request, where array calls would dominate; both give identical
+    features (see check_parity).
+    """
+
+    def __init__(self, classes, mean, scale, reference_year, feature_names=FEATURE_NAMES):
+        self.feature_names = list(feature_names)
+        unknown = sorted(set(self.feature_names) - set(FEATURE_NAMES))
+        if unknown:
+            raise ValueError(f"Unknown features: {', '.join(unknown)}")
+        self.reference_year = int(reference_year)
+        self.encoders = CategoryEncoder(classes)
+        self.scaler = FeatureScaler(mean, scale)
+        self.positions = {name: i for i, name in enumerate(self.feature_names)}
+
+        self.age_group_codes = np.array([self.encoders.encode('age_group', group) for group in AGE_GROUPS])
+        self.make_category_codes = np.array([
+            self.encoders.encode('vehicle_category', vehicle_category_for(make))
+            for make in self.encoders.classes['vehicle_make'].tolist()
+        ])
+        # Python ints for transform_record()
+        self._age_group_codes = self.age_group_codes.tolist()
+        self._make_category_codes = self.make_category_codes.tolist()
+
+    @classmethod
+    def from_fitted(cls, label_encoders, scaler, reference_year, feature_names=FEATURE_NAMES):
+        """From the fitted LabelEncoders and StandardScaler (None: no scaling)"""
+        classes = {field: encoder.classes_ for field, encoder in label_encoders.items()}
+        if scaler is None:
+            return cls(classes, np.zeros(len(feature_names)), np.ones(len(feature_names)),
+                       reference_year, feature_names)
+        return cls(classes, scaler.mean_, scaler.scale_, reference_year, feature_names)
+
+    def to_dict(self):
+        return {
+            "reference_year": self.reference_year,
+            "feature_names": self.feature_names,
+            "classes": self.encoders.to_classes(),
+            "mean": self.scaler.mean.tolist(),
+            "scale": self.scaler.scale.tolist()
+        }
+
+    @classmethod
+    def from_dict(cls, spec):
+        return cls(spec['classes'], spec['mean'], spec['scale'], spec['reference_year'],
+                   spec['feature_names'])
+
+    def save(self, path=TRANSFORMER_PATH):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path=TRANSFORMER_PATH):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    @classmethod
+    def load_artifacts(cls, models_dir='models'):
+        """feature_transformer.json, or for older model versions the pickled
+        encoders, scaler and feature names"""
+        path = os.path.join(models_dir, 'feature_transformer.json')
+        if os.path.exists(path):
+            return cls.load(path)
+        import joblib
+        return cls.from_fitted(
+            joblib.load(os.path.join(models_dir, 'encoders.pkl')),
+            joblib.load(os.path.join(models_dir, 'scaler.pkl')),
+            LEGACY_REFERENCE_YEAR,
+            joblib.load(os.path.join(models_dir, 'feature_names.pkl'))
+        )
+
+    def codes(self, field, values):
+        """Label codes of a column; raises UnknownCategoryError"""
+        categories = getattr(getattr(values, 'cat', None), 'categories', None)
+        if categories is None:
+            return self.encoders.encode_column(field, values)
+        # pandas categorical: encode each category once
+        category_codes, known = self.encoders.encode_column(field, categories, strict=False)
+        positions = values.cat.codes.to_numpy()
+        valid = positions >= 0
+        valid[valid] = known[positions[valid]]
+        if not valid.all():
+            missing = np.argmin(valid)
+            raise UnknownCategoryError(field, values.iloc[missing] if positions[missing] >= 0 else None)
+        return category_codes[positions]
+
+    def features(self, columns):
+        """Unscaled (n, features) matrix for a DataFrame or dict of raw columns"""
+        age = np.asarray(columns['age'], dtype=np.float64)
+        annual_mileage = np.asarray(columns['annual_mileage'], dtype=np.float64)
+        vehicle_age = self.reference_year - np.asarray(columns['vehicle_year'], dtype=np.float64)
+        make_codes = self.codes('vehicle_make', columns['vehicle_make'])
+
+        values = {
+            'age': age,
+            'bmi': columns['bmi'],
+            'children': columns['children'],
+            'annual_mileage': annual_mileage,
+            'vehicle_age': vehicle_age,
+            'vehicle_make_encoded': make_codes,
+            'age_group_encoded': self.age_group_codes[np.searchsorted(AGE_GROUP_EDGES, age, side='left')],
+            'vehicle_category_encoded': self.make_category_codes[make_codes],
+            'high_mileage': annual_mileage > HIGH_MILEAGE_THRESHOLD,
+            'old_vehicle': vehicle_age > OLD_VEHICLE_AGE
+        }
+        X = np.empty((len(age), len(self.feature_names)))
+        for i, name in enumerate(self.feature_names):
+            if name in values:
+                X[:, i] = values[name]
+            else:
+                X[:, i] = self.codes(name[:-len('_encoded')], columns[name[:-len('_encoded')]])
+        return X
+
+    def scale(self, X):
+        """Scale an unscaled feature matrix in place and return it"""
+        X -= self.scaler.mean
+        X /= self.scaler.scale
+        return X
+
+    def transform(self, columns):
+        """Scaled model features for a DataFrame or dict of raw columns"""
+        return self.scale(self.features(columns))
+
+    def segments(self, X):
+        """(age_group, vehicle_category) label arrays from an unscaled feature matrix"""
+        classes = self.encoders.classes
+        return (classes['age_group'][X[:, self.positions['age_group_encoded']].astype(np.intp)],
+                classes['vehicle_category'][X[:, self.positions['vehicle_category_encoded']].astype(np.intp)])
+
+    def record_values(self, record):
+        """Unscaled feature values of one QuoteRecord in feature order,
+        with its age group and vehicle category"""
+        encode = self.encoders.encode
+        vehicle_age = self.reference_year - record.vehicle_year
+        age_bin = bisect.bisect_left(AGE_GROUP_EDGES, record.age)
+        make_code = encode('vehicle_make', record.vehicle_make)
+        values = {
+            'age': record.age,
+            'bmi': record.bmi,
+            'children': record.children,
+            'annual_mileage': record.annual_mileage,
+            'vehicle_age': vehicle_age,
+            'sex_encoded': encode('sex', record.sex),
+            'smoker_encoded': encode('smoker', record.smoker),
+            'region_encoded': encode('region', record.region),
+            'vehicle_make_encoded': make_code,
+            'usage_type_encoded': encode('usage_type', record.usage_type),
+            'fuel_type_encoded': encode('fuel_type', record.fuel_type),
+            'age_group_encoded': self._age_group_codes[age_bin],
+            'vehicle_category_encoded': self._make_category_codes[make_code],
+            'high_mileage': 1 if record.annual_mileage > HIGH_MILEAGE_THRESHOLD else 0,
+            'old_vehicle': 1 if vehicle_age > OLD_VEHICLE_AGE else 0
+        }
+        return ([values[name] for name in self.feature_names], AGE_GROUPS[age_bin],
+                vehicle_category_for(record.vehicle_make))
+
+    def transform_record(self, record):
+        """(scaled (1, features) array, age group, vehicle category) for one QuoteRecord"""
+        values, age_group, vehicle_category = self.record_values(record)
+        return self.scaler.transform_row(values), age_group, vehicle_category
+
+def check_parity(transformer, df, sample=2000, seed=0):
+    """Compare the serving path with the training transform on rows of df
+
+    A sample of rows goes through request validation and
+    transform_record() as a quote would, and must give exactly the
+    features transform() gives the same rows. Returns the number of rows
+    checked; raises AssertionError naming the first differing feature.
+    """
+    from validation import QuoteValidator, QUOTE_FIELDS
+
+    rows = np.random.default_rng(seed).permutation(len(df))[:sample]
+    batch = df.iloc[rows]
+    expected = transformer.transform(batch)
+    validator = QuoteValidator(transformer.encoders.to_classes())
+    for position, payload in enumerate(batch[QUOTE_FIELDS].to_dict('records')):
+        payload = {field: value.item() if hasattr(value, 'item') else value for field, value in payload.items()}
+        served = transformer.transform_record(validator.validate(payload))[0][0]
+        if not np.array_equal(served, expected[position]):
+            name = transformer.feature_names[int(np.argmax(served != expected[position]))]
+            raise AssertionError(f"Row {int(rows[position])}: serving and training differ in {name}")
+    return len(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Fitted feature transform shared by training and serving")
+    parser.add_argument('--check', action='store_true',
+                        help="Check serving features against training features on the processed data")
+    parser.add_argument('--sample', type=int, default=2000, help="Rows to check")
+    args = parser.parse_args()
+    if not args.check:
+        parser.print_help()
+        return
+
+    from table_store import read_table
+    transformer = FeatureTransformer.load_artifacts()
+    checked = check_parity(transformer, read_table('data/insurance_processed'), args.sample)
+    print(f"✅ Serving and training features identical on {checked:,} rows")
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@ import numpy as np
 import json
 import os
 
+from table_store import read_table
+
 def generate_insights():
     """Generate user-friendly insights from insurance data"""
     
@@ -10,7 +12,7 @@ def generate_insights():
     print("=" * 60)
     
     # Load processed data
-    df = pd.read_csv('data/insurance_processed.csv')
+    df = read_table('data/insurance_processed', categories=False)
     
     # Create visualization data directory
     os.makedirs('visualization_data', exist_ok=True)
@@ -0,0 +1,34 @@
+"""Gunicorn settings for copy-on-write friendly multi-worker serving
+
+    gunicorn -c gunicorn_preload.py app:app
+
+The app (model, reference data, segment tables, premium index) is loaded
+once in the master and shared with the forked workers instead of being
+loaded by every worker. Two things keep those pages shared:
+
+- the serving bundle is memory-mapped read-only, so the model arrays and
+  reference columns are page-cache pages shared by every process;
+- the garbage collector is kept off in the master and everything it
+  allocated is frozen before forking, so collections in a worker never
+  write to the GC headers of the preloaded objects.
+
+Workers, threads and the bind address come from the usual gunicorn
+options and environment (WEB_CONCURRENCY, GUNICORN_CMD_ARGS, PORT).
+"""
+import gc
+import os
+
+preload_app = True
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+# Collections in the master would only fragment the heap we are about to
+# share; each worker turns the collector back on after forking
+gc.disable()
+
+def pre_fork(server, worker):
+    # Move everything allocated so far into the permanent generation.
+    # Runs before every fork, so workers respawned later are covered too.
+    gc.freeze()
+
+def post_fork(server, worker):
+    gc.enable()
@@ -0,0 +1,34 @@
+import json
+import os
+
+from cached_response import CachedJSONResponse
+
+# Deliberately free of NumPy/pandas so serving insights stays cheap on cold start
+INSIGHTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'visualization_data')
+
+INSIGHT_FILES = [
+    'brand_comparison',
+    'age_vs_premium',
+    'smoking_impact',
+    'mileage_impact',
+    'vehicle_age_impact',
+    'gender_comparison',
+    'region_comparison',
+    'fuel_type_comparison',
+    'usage_type_comparison',
+    'savings_calculator',
+    'most_popular',
+    'premium_distribution'
+]
+
+def load_insights(directory=INSIGHTS_DIR):
+    """Load the insight bundle and pre-serialize the GET responses
+
+    Returns (insights_response, brands_response); raises if any file is
+    missing or invalid.
+    """
+    insights = {}
+    for insight_file in INSIGHT_FILES:
+        with open(os.path.join(directory, f'{insight_file}.json'), 'r') as f:
+            insights[insight_file] = json.load(f)
+    return CachedJSONResponse(insights), CachedJSONResponse(insights['brand_comparison'])
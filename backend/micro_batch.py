@@ -0,0 +1,127 @@
+from collections import Counter
+from concurrent.futures import Future, TimeoutError
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+class MicroBatcher:
+    """Coalesce concurrent single-quote predictions into one predict call
+
+    Callers block in predict() while a background thread collects feature
+    rows for up to `window_ms` (or until `max_batch_size` rows are waiting),
+    runs one prediction for all of them and hands each caller its slice.
+    Only useful when a worker serves requests concurrently, e.g. gunicorn
+    with --threads.
+
+    A caller that has waited `latency_ceiling_ms` without a result predicts
+    its own rows directly, so batching never adds more than that to a quote.
+    """
+
+    def __init__(self, predict, max_batch_size=64, window_ms=2.0, latency_ceiling_ms=50.0):
+        self._predict = predict
+        self.max_batch_size = max_batch_size
+        self.window = window_ms / 1000
+        self.latency_ceiling = latency_ceiling_ms / 1000
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pid = None
+
+        self.batch_sizes = Counter()
+        self.requests = 0
+        self.timeouts = 0
+
+    def _ensure_started(self):
+        # Threads do not survive fork, so start one per worker process
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue()
+                    threading.Thread(target=self._run, name='micro-batcher', daemon=True).start()
+                    self._pid = os.getpid()
+
+    def predict(self, features):
+        """Predict a small feature matrix, batched with other waiting callers"""
+        self._ensure_started()
+        features = np.asarray(features)
+        future = Future()
+        self._queue.put((features, future))
+
+        try:
+            return future.result(timeout=self.latency_ceiling)
+        except TimeoutError:
+            if not future.cancel():
+                # Already being predicted; it cannot take much longer
+                return future.result()
+            with self._lock:
+                self.timeouts += 1
+            return self._predict(features)
+
+    def close(self):
+        """Stop the worker thread once the requests already queued are served"""
+        self._queue.put(None)
+
+    def _run(self):
+        closing = False
+        while not closing:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            rows = len(item[0])
+            deadline = time.perf_counter() + self.window
+
+            while rows < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    closing = True
+                    break
+                batch.append(item)
+                rows += len(item[0])
+
+            # Skip callers that gave up waiting
+            batch = [(features, future) for features, future in batch
+                     if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            try:
+                predictions = self._predict(np.vstack([features for features, _ in batch]))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for features, future in batch:
+                future.set_result(predictions[offset:offset + len(features)])
+                offset += len(features)
+
+            with self._lock:
+                self.requests += len(batch)
+                self.batch_sizes[len(batch)] += 1
+
+    def stats(self):
+        """Batch-size distribution and counters since startup"""
+        with self._lock:
+            batches = sum(self.batch_sizes.values())
+            histogram = Counter()
+            for size, count in self.batch_sizes.items():
+                # Power-of-two buckets: 1, 2, 4, 8, ...
+                histogram[1 << (size - 1).bit_length()] += count
+            return {
+                "requests": self.requests,
+                "batches": batches,
+                "mean_batch_size": self.requests / batches if batches else 0.0,
+                "batch_size_histogram": dict(sorted(histogram.items())),
+                "timeouts": self.timeouts
+            }
@@ -0,0 +1,120 @@
+import datetime
+import json
+import os
+import shutil
+
+from artifact_bundle import file_version
+
+REGISTRY_DIR = 'models/registry'
+
+# Files copied into each registered version; the first four are required
+ARTIFACT_FILES = ['premium_predictor.pkl', 'scaler.pkl', 'encoders.pkl', 'feature_names.pkl',
+                  'feature_transformer.json', 'serving_bundle.bin', 'model_metrics.pkl',
+                  'feature_importance.csv']
+REQUIRED_FILES = ARTIFACT_FILES[:4]
+
+class RegistryError(ValueError):
+    """Raised for an unknown or incomplete model version"""
+
+class ModelRegistry:
+    """Versioned model artifacts under models/registry/<version>/
+
+    A version is the content hash of its premium_predictor.pkl. The active
+    version is recorded in current.json together with the one it replaced,
+    so serving processes can follow it and roll back to the previous one.
+    """
+
+    def __init__(self, path=REGISTRY_DIR):
+        self.path = path
+        self.pointer_path = os.path.join(path, 'current.json')
+
+    def version_dir(self, version):
+        return os.path.join(self.path, version)
+
+    def versions(self):
+        """Manifests of all registered versions, oldest first"""
+        if not os.path.isdir(self.path):
+            return []
+        manifests = []
+        for name in os.listdir(self.path):
+            manifest_path = os.path.join(self.path, name, 'manifest.json')
+            if os.path.exists(manifest_path):
+                with open(manifest_path) as f:
+                    manifests.append(json.load(f))
+        return sorted(manifests, key=lambda manifest: manifest['created_at'])
+
+    def pointer(self):
+        """Contents of current.json ({} when nothing is active)"""
+        try:
+            with open(self.pointer_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def current(self):
+        """The active version, or None when the registry is empty"""
+        return self.pointer().get('version')
+
+    def publish(self, models_dir='models', activate=True):
+        """Copy the artifacts in models_dir into a new version
+
+        Publishing the same model twice is a no-op apart from activating it.
+        Returns the version.
+        """
+        for name in REQUIRED_FILES:
+            if not os.path.exists(os.path.join(models_dir, name)):
+                raise RegistryError(f"Cannot publish: {models_dir}/{name} is missing")
+
+        version = file_version(os.path.join(models_dir, 'premium_predictor.pkl'))
+        target = self.version_dir(version)
+        if not os.path.exists(os.path.join(target, 'manifest.json')):
+            staging = f'{target}.tmp'
+            shutil.rmtree(staging, ignore_errors=True)
+            os.makedirs(staging)
+            files = []
+            for name in ARTIFACT_FILES:
+                source = os.path.join(models_dir, name)
+                if os.path.exists(source):
+                    shutil.copy2(source, os.path.join(staging, name))
+                    files.append(name)
+            with open(os.path.join(staging, 'manifest.json'), 'w') as f:
+                json.dump({
+                    "version": version,
+                    "created_at": datetime.datetime.now().isoformat(timespec='seconds'),
+                    "files": files
+                }, f, indent=2)
+            shutil.rmtree(target, ignore_errors=True)
+            os.replace(staging, target)
+
+        if activate:
+            self.activate(version)
+        return version
+
+    def activate(self, version):
+        """Point current.json at version, remembering the one it replaces"""
+        if not os.path.exists(os.path.join(self.version_dir(version), 'manifest.json')):
+            raise RegistryError(f"Unknown model version: {version}")
+        current = self.current()
+        if current == version:
+            return
+        pointer = {
+            "version": version,
+            "previous": current,
+            "activated_at": datetime.datetime.now().isoformat(timespec='seconds')
+        }
+        tmp_path = f'{self.pointer_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(pointer, f, indent=2)
+        os.replace(tmp_path, self.pointer_path)
+
+    def rollback(self):
+        """Re-activate the version that the current one replaced"""
+        previous = self.pointer().get('previous')
+        if previous is None:
+            raise RegistryError("No previous model version to roll back to")
+        self.activate(previous)
+        return previous
+
+if __name__ == "__main__":
+    version = ModelRegistry().publish()
+    print(f"✓ Published and activated model version {version} in {REGISTRY_DIR}")
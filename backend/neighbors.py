@@ -0,0 +1,281 @@
+"""Exact nearest-neighbour index for the similar-driver comparison
+
+    python neighbors.py --benchmark --rows 200000,2000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+class KDTree:
+    """Exact k-nearest-neighbour index over a fixed set of points
+
+    A balanced tree that splits on the dimension of largest variance,
+    between two distinct values next to the median. Most scaled features
+    are label codes or small counts; a cut at the median itself would leave
+    tied rows on both sides and every cell below it as wide as its parent in
+    that dimension.
+
+    Points are reordered so that every leaf is a contiguous block of about
+    `leaf_size` rows, and the tree is just flat arrays (split dimension and
+    value of the internal nodes in heap order, first row of every leaf,
+    bounding box of every node), so it can be stored in the serving bundle
+    and memory-mapped.
+    """
+
+    # Levels of the tree pruned per array pass in query()
+    LEVEL_STEP = 4
+
+    # Rows scanned around the query for the first k-th distance, per neighbour
+    SEED_ROWS = 16
+
+    # Up to this many points a query scans them all, which beats the tree
+    SCAN_ROWS = 4096
+
+    def __init__(self, points, index, split_dim, split_value, leaf_start, lower, upper):
+        # points are in leaf order; index maps them back to the original rows
+        self.points = points
+        self.index = index
+        self.split_dim = split_dim
+        self.split_value = split_value
+        self.leaf_start = leaf_start
+        # Bounding box of every node in heap order; empty nodes are (inf, -inf)
+        self.lower = lower
+        self.upper = upper
+        self.depth = int(np.log2(len(leaf_start) - 1))
+        # The descent indexes one node at a time, which is cheaper on lists
+        self._splits = list(zip(split_dim.tolist(), split_value.tolist()))
+        self._leaf_start = leaf_start.tolist()
+        # Offsets of a node's descendants LEVEL_STEP levels down from (node + 1) << LEVEL_STEP
+        self._descendants = np.arange(-1, (1 << self.LEVEL_STEP) - 1)
+
+    @classmethod
+    def build(cls, points, leaf_size=16):
+        """Build the tree for an (n, d) array; points are stored as float32"""
+        points = np.ascontiguousarray(points, dtype=np.float32)
+        n = len(points)
+        depth = int(np.ceil(np.log2(n / leaf_size))) if n > leaf_size else 0
+        internal = 2 ** depth - 1
+
+        order = np.arange(n, dtype=np.int64)
+        split_dim = np.zeros(internal, dtype=np.int32)
+        split_value = np.full(internal, np.inf, dtype=np.float32)
+        leaf_start = np.zeros(internal + 2, dtype=np.int64)
+
+        # (node, first row, end row) in the current order
+        stack = [(0, 0, n)]
+        while stack:
+            node, start, stop = stack.pop()
+            if node >= internal:
+                leaf_start[node - internal] = start
+                continue
+            middle = stop
+            if stop - start > 1:
+                rows = order[start:stop]
+                block = points[rows]
+                variance = block.var(axis=0)
+                # Rounding can leave a constant column a tiny variance
+                variance[block.min(axis=0) == block.max(axis=0)] = 0
+                dim = int(np.argmax(variance))
+                # Rows that are all one point stay on the left
+                if variance[dim] > 0:
+                    column = block[:, dim]
+                    half = len(rows) // 2
+                    median = np.partition(column, half)[half]
+                    below = column < median
+                    # Cut before or after the rows equal to the median,
+                    # whichever is nearer the middle and leaves both sides rows
+                    before = int(below.sum())
+                    after = before + int((column == median).sum())
+                    if not before or (after < len(rows) and after - half < half - before):
+                        below = column <= median
+                    rows = np.concatenate([rows[below], rows[~below]])
+                    order[start:stop] = rows
+                    middle = start + int(below.sum())
+                    split_dim[node] = dim
+                    split_value[node] = column[~below].min()
+            stack.append((2 * node + 2, middle, stop))
+            stack.append((2 * node + 1, start, middle))
+        leaf_start[-1] = n
+
+        points = points[order]
+        # Leaf boxes, then each level up from its children
+        filled = np.flatnonzero(np.diff(leaf_start))
+        lower = np.full((internal + 1, points.shape[1]), np.inf, dtype=np.float32)
+        upper = np.full((internal + 1, points.shape[1]), -np.inf, dtype=np.float32)
+        if len(filled):
+            lower[filled] = np.minimum.reduceat(points, leaf_start[filled], axis=0)
+            upper[filled] = np.maximum.reduceat(points, leaf_start[filled], axis=0)
+        lowers, uppers = [lower], [upper]
+        while len(lowers[-1]) > 1:
+            lowers.append(np.minimum(lowers[-1][0::2], lowers[-1][1::2]))
+            uppers.append(np.maximum(uppers[-1][0::2], uppers[-1][1::2]))
+
+        return cls(points, order, split_dim, split_value, leaf_start,
+                   np.concatenate(lowers[::-1]), np.concatenate(uppers[::-1]))
+
+    def to_arrays(self):
+        return {
+            'points': self.points, 'index': self.index, 'split_dim': self.split_dim,
+            'split_value': self.split_value, 'leaf_start': self.leaf_start,
+            'lower': self.lower, 'upper': self.upper
+        }
+
+    def __len__(self):
+        return len(self.points)
+
+    def query(self, point, k=1):
+        """(distances, rows) of the k nearest points to point, nearest first
+
+        Sets of up to SCAN_ROWS points are scanned whole. Otherwise the k-th
+        nearest of the smallest subtree around point that holds
+        SEED_ROWS * k rows bounds the answer. Then, LEVEL_STEP levels at a
+        time, nodes whose box is farther than the bound are dropped and the
+        rest replaced by their descendants. On the last two levels the nodes
+        with the nearest boxes are scanned first to tighten the bound, and
+        the leaves that are left at the bottom are scanned for the answer.
+        Ties at the k-th distance go to the point stored first.
+        """
+        # Rounded like the stored points, so a query on a stored value walks
+        # down its side of a split; float64 so box and point distances round alike
+        point = np.asarray(point, dtype=self.points.dtype).astype(np.float64).ravel()
+        k = min(k, len(self.points))
+        if not k:
+            return np.empty(0), np.empty(0, dtype=np.int64)
+        if len(self.points) <= self.SCAN_ROWS:
+            difference = self.points - point
+            return self._nearest(np.arange(len(self.points)), np.einsum('ij,ij->i', difference, difference), k)
+        depth = self.depth
+        leaf_start = self._leaf_start
+        needed = min(self.SEED_ROWS * k, len(self.points))
+
+        # Walk down to the leaf point falls in, then up until there are enough rows
+        coordinates = point.tolist()
+        node = 0
+        for _ in range(depth):
+            dim, value = self._splits[node]
+            node = 2 * node + (1 if coordinates[dim] < value else 2)
+        leaf = node - (2 ** depth - 1)
+        height = 0
+        while leaf_start[(leaf >> height) + 1 << height] - leaf_start[leaf >> height << height] < needed:
+            height += 1
+        first, stop = leaf_start[leaf >> height << height], leaf_start[(leaf >> height) + 1 << height]
+        difference = self.points[first:stop] - point
+        distance = np.einsum('ij,ij->i', difference, difference)
+        if stop - first == len(self.points):
+            return self._nearest(np.arange(first, stop), distance, k)
+        worst = np.partition(distance, k - 1)[k - 1]
+
+        # From the level that reaches the leaves in whole steps
+        level = depth - self.LEVEL_STEP * (max(depth - self.LEVEL_STEP, 0) // self.LEVEL_STEP)
+        nodes = np.arange(2 ** level - 1, 2 ** (level + 1) - 1)
+        while True:
+            near = self._near(nodes, point)
+            keep = near <= worst
+            nodes, near = nodes[keep], near[keep]
+            if level + self.LEVEL_STEP > depth:
+                break
+            if level + self.LEVEL_STEP == depth:
+                worst = self._tighten(nodes, near, level, worst, needed, k, point)
+                nodes = nodes[near <= worst]
+            nodes = (((nodes + 1) << self.LEVEL_STEP)[:, None] + self._descendants).ravel()
+            level += self.LEVEL_STEP
+
+        leaves = nodes - (2 ** depth - 1)
+        worst = self._tighten(nodes, near, level, worst, needed, k, point)
+        rows, distance = self._scan(leaves[near <= worst], point)
+        return self._nearest(rows, distance, k)
+
+    def _near(self, nodes, point):
+        """Squared distance from point to each node's box"""
+        gap = np.maximum(self.lower[nodes] - point, point - self.upper[nodes])
+        np.maximum(gap, 0, out=gap)
+        return np.einsum('ij,ij->i', gap, gap)
+
+    def _tighten(self, nodes, near, level, worst, needed, k, point):
+        """worst, or the k-th distance among the `needed` rows of the nearest nodes if smaller"""
+        order = np.argsort(near)
+        height = self.depth - level
+        first = (nodes[order] - (2 ** level - 1)) << height
+        rows = np.cumsum(self.leaf_start[first + (1 << height)] - self.leaf_start[first])
+        nearest = order[:np.searchsorted(rows, needed) + 1]
+        leaves = ((nodes[nearest] - (2 ** level - 1)) << height)[:, None] + np.arange(1 << height)
+        _, distance = self._scan(leaves.ravel(), point)
+        if len(distance) < k:
+            return worst
+        return min(worst, np.partition(distance, k - 1)[k - 1])
+
+    def _scan(self, leaves, point):
+        """(rows, squared distances) of the points in the given leaves"""
+        start = self.leaf_start[leaves]
+        counts = self.leaf_start[leaves + 1] - start
+        offsets = np.cumsum(counts) - counts
+        rows = np.arange(int(counts.sum())) + np.repeat(start - offsets, counts)
+        difference = self.points[rows] - point
+        return rows, np.einsum('ij,ij->i', difference, difference)
+
+    def _nearest(self, rows, distance, k):
+        """(distances, original rows) of the k smallest distances, ties by row"""
+        candidates = np.flatnonzero(distance <= np.partition(distance, k - 1)[k - 1])
+        nearest = candidates[np.lexsort((rows[candidates], distance[candidates]))[:k]]
+        return np.sqrt(distance[nearest]), self.index[rows[nearest]]
+
+def benchmark(rows, queries=1000, k=50, seed=42, checked=20):
+    """Build time and query latency of an index over `rows` synthetic policies
+
+    The index is queried with `queries` new applicants from another random
+    stream, the way quotes query it, and the first `checked` answers are
+    compared with a brute-force scan.
+    """
+    from synthetic_data import policy_frame
+    from features import FeatureTransformer
+
+    transformer = FeatureTransformer.load()
+    points = transformer.transform(policy_frame(rows, seed))
+    applicants = transformer.transform(policy_frame(queries, seed + 1))
+
+    start = time.perf_counter()
+    index = KDTree.build(points)
+    build_seconds = time.perf_counter() - start
+
+    latencies = []
+    for applicant in applicants:
+        start = time.perf_counter()
+        index.query(applicant, k)
+        latencies.append(time.perf_counter() - start)
+    latencies = np.array(latencies) * 1000
+
+    stored = index.points.astype(np.float64)
+    for applicant in applicants[:checked]:
+        distances, _ = index.query(applicant, k)
+        difference = stored - applicant.astype(np.float32)
+        expected = np.sqrt(np.sort(np.einsum('ij,ij->i', difference, difference))[:k])
+        assert np.allclose(distances, expected, rtol=1e-12, atol=0), \
+            f"Neighbours differ from a brute-force scan for applicant {applicant.tolist()}"
+
+    return {
+        "rows": rows, "build_s": round(build_seconds, 1),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Nearest-neighbour index for similar drivers")
+    parser.add_argument('--benchmark', action='store_true', help="Time queries on synthetic policies")
+    parser.add_argument('--rows', default='200000,2000000', help="Comma-separated index sizes")
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('-k', type=int, default=50, help="Neighbours per query (SIMILAR_DRIVERS)")
+    args = parser.parse_args()
+    if not args.benchmark:
+        parser.print_help()
+        return
+
+    for rows in (int(value) for value in args.rows.split(',')):
+        print(f"🔎 {args.k} nearest of {rows:,} synthetic policies, {args.queries:,} applicants...")
+        result = benchmark(rows, args.queries, args.k)
+        print(f"   build {result['build_s']:6.1f} s   p50 {result['p50_ms']:6.3f} ms   "
+              f"p95 {result['p95_ms']:6.3f} ms   p99 {result['p99_ms']:6.3f} ms   (exact)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""Data and model pipeline: download -> preprocess -> train / insights
+
+    python pipeline.py                 # run what is out of date
+    python pipeline.py --force preprocess   # rerun a stage even if up to date
+    python pipeline.py --dry-run
+
+Every stage is a script with declared inputs and outputs. A stage is
+skipped when the content hash of its inputs - its script and the local
+modules it imports, its input files, and the environment variables it
+reads - matches the last successful run and its outputs are still the ones
+that run wrote. Stages depend on the stages that write their inputs, and
+stages whose inputs are ready run in parallel (train and insights both
+only need preprocess).
+
+State is kept in .pipeline_state.json. File hashes are reused while a
+file's size and modification time are unchanged, so an up-to-date run
+does not re-read the data.
+"""
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_PATH = '.pipeline_state.json'
+
+# Tables are saved by table_store in one or more formats (a directory of
+# .npy columns, or a file with the format's extension)
+TABLES = ['data/insurance_processed', 'data/X_train', 'data/X_test', 'data/y_train', 'data/y_test']
+PREPROCESSED_MODELS = ['models/scaler.pkl', 'models/encoders.pkl', 'models/feature_names.pkl',
+                       'models/feature_transformer.json']
+
+class Stage:
+    """One pipeline step: a script run from backend/ and the files it reads and writes"""
+
+    def __init__(self, name, script, description, inputs=(), outputs=(), env=()):
+        self.name = name
+        self.script = script
+        self.description = description
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.env = list(env)
+
+STAGES = [
+    Stage('download', 'data_download.py', "Downloading and enhancing insurance dataset",
+          outputs=['data/raw_insurance.csv', 'data/insurance.csv']),
+    Stage('preprocess', 'preprocessing.py', "Preprocessing data and feature engineering",
+          inputs=['data/insurance.csv'], outputs=TABLES + PREPROCESSED_MODELS,
+          env=['DATA_FORMAT']),
+    Stage('train', 'train_models.py', "Training AI premium prediction model",
+          inputs=TABLES + PREPROCESSED_MODELS,
+          outputs=['models/premium_predictor.pkl', 'models/model_metrics.pkl',
+                   'models/feature_importance.csv', 'models/serving_bundle.bin']),
+    Stage('insights', 'generate_visualizations.py', "Generating user-friendly insights",
+          inputs=['data/insurance_processed'], outputs=['visualization_data'])
+]
+
+def expand_path(path):
+    """Files stored under path: the file, every file of a directory, or a table's copies"""
+    if os.path.isfile(path):
+        return [path]
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(path) for name in names
+        )
+    from table_store import TABLE_FORMATS, format_path
+
+    files = []
+    for table_format in TABLE_FORMATS:
+        stored = format_path(path, table_format)
+        if stored != path and os.path.exists(stored):
+            files += expand_path(stored)
+    return files
+
+def local_imports(script, seen=None):
+    """script and the backend modules it imports, directly or not"""
+    seen = set() if seen is None else seen
+    if script in seen:
+        return seen
+    seen.add(script)
+    with open(script) as f:
+        tree = ast.parse(f.read(), script)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names = [node.module]
+        else:
+            continue
+        for name in names:
+            module = name.split('.')[0] + '.py'
+            if os.path.exists(module):
+                local_imports(module, seen)
+    return seen
+
+class FileHashes:
+    """sha256 of files, reused while (size, mtime) is unchanged"""
+
+    def __init__(self, known=None):
+        self.known = dict(known or {})
+        self.lock = threading.Lock()
+
+    def file(self, path):
+        stat = os.stat(path)
+        key = [stat.st_size, stat.st_mtime_ns]
+        with self.lock:
+            cached = self.known.get(path)
+        if cached and cached[:2] == key:
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        with self.lock:
+            self.known[path] = key + [digest.hexdigest()]
+        return digest.hexdigest()
+
+    def paths(self, paths):
+        """Combined hash of paths (None when one of them does not exist)"""
+        digest = hashlib.sha256()
+        for path in paths:
+            files = expand_path(path)
+            if not files:
+                return None
+            for name in files:
+                digest.update(f"{name}\0{self.file(name)}\n".encode())
+        return digest.hexdigest()
+
+def input_hash(stage, hashes):
+    digest = hashlib.sha256()
+    digest.update(hashes.paths(sorted(local_imports(stage.script))).encode())
+    files = hashes.paths(stage.inputs)
+    if files is None:
+        return None
+    digest.update(files.encode())
+    for name in stage.env:
+        digest.update(f"{name}={os.environ.get(name, '')}\n".encode())
+    return digest.hexdigest()
+
+def upstream(stages):
+    """{stage name: names of the stages writing its inputs}"""
+    writers = {}
+    for stage in stages:
+        for path in stage.outputs:
+            writers[path] = stage.name
+    return {
+        stage.name: sorted({writers[path] for path in stage.inputs if path in writers} - {stage.name})
+        for stage in stages
+    }
+
+def load_state(path=STATE_PATH):
+    if not os.path.exists(path):
+        return {"stages": {}, "files": {}}
+    with open(path) as f:
+        return json.load(f)
+
+def save_state(state, path=STATE_PATH):
+    temporary = path + '.tmp'
+    with open(temporary, 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(temporary, path)
+
+print_lock = threading.Lock()
+
+def run_script(stage):
+    """Run the stage's script, streaming its output prefixed with the stage name"""
+    environment = dict(os.environ, PYTHONUNBUFFERED='1', PYTHONIOENCODING='utf-8')
+    process = subprocess.Popen(
+        [sys.executable, stage.script], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        env=environment, text=True, encoding='utf-8', errors='replace'
+    )
+    for line in process.stdout:
+        with print_lock:
+            print(f"[{stage.name}] {line.rstrip()}", flush=True)
+    return process.wait()
+
+def run_pipeline(stages=STAGES, force=(), dry_run=False, workers=None, state_path=STATE_PATH):
+    """Run the out-of-date stages; returns [(name, status, seconds)] in stage order
+
+    status is 'ran', 'skipped', 'failed' or 'blocked' (an upstream stage
+    failed); with dry_run, 'would run'. Stages named in force run whatever
+    their hashes; the stages after them still only run if their inputs
+    changed.
+    """
+    depends_on = upstream(stages)
+    unknown = sorted(set(force) - set(depends_on))
+    if unknown:
+        raise ValueError(f"Unknown stage {', '.join(unknown)}; expected some of {', '.join(depends_on)}")
+    forced = set(force)
+    by_name = {stage.name: stage for stage in stages}
+    state = load_state(state_path)
+    hashes = FileHashes(state.get("files"))
+    results = {}
+
+    def up_to_date(stage, inputs):
+        recorded = state["stages"].get(stage.name)
+        return (stage.name not in forced and inputs is not None and recorded is not None
+                and recorded["inputs"] == inputs
+                and recorded["outputs"] == hashes.paths(stage.outputs))
+
+    def execute(stage, upstream_changed):
+        start = time.perf_counter()
+        if dry_run:
+            # The inputs an upstream stage would rewrite are not known yet
+            stale = upstream_changed or not up_to_date(stage, input_hash(stage, hashes))
+            return 'would run' if stale else 'skipped', time.perf_counter() - start
+        if up_to_date(stage, input_hash(stage, hashes)):
+            return 'skipped', time.perf_counter() - start
+        with print_lock:
+            print(f"\n🚀 {stage.name}: {stage.description}", flush=True)
+        returncode = run_script(stage)
+        seconds = time.perf_counter() - start
+        if returncode != 0:
+            with print_lock:
+                print(f"❌ {stage.name} - FAILED (exit code {returncode})", flush=True)
+            return 'failed', seconds
+        outputs = hashes.paths(stage.outputs)
+        if outputs is None:
+            with print_lock:
+                print(f"❌ {stage.name} - did not write all of {', '.join(stage.outputs)}", flush=True)
+            return 'failed', seconds
+        # Inputs are rehashed after the run, as the script saw them
+        state["stages"][stage.name] = {
+            "inputs": input_hash(stage, hashes), "outputs": outputs, "seconds": round(seconds, 2)
+        }
+        with print_lock:
+            print(f"✅ {stage.name} - COMPLETE ({seconds:.1f} s)", flush=True)
+        return 'ran', seconds
+
+    with ThreadPoolExecutor(max_workers=workers or len(stages)) as pool:
+        running = {}
+        while len(results) < len(stages):
+            for stage in stages:
+                name = stage.name
+                if name in results or name in running.values():
+                    continue
+                parents = [results.get(parent, (None,))[0] for parent in depends_on[name]]
+                if any(status in ('failed', 'blocked') for status in parents):
+                    results[name] = ('blocked', 0.0)
+                elif all(status is not None for status in parents):
+                    running[pool.submit(execute, stage, 'would run' in parents)] = name
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+            if not dry_run:
+                state["files"] = {path: known for path, known in hashes.known.items() if os.path.exists(path)}
+                save_state(state, state_path)
+
+    return [(stage.name, *results[stage.name]) for stage in stages]
+
+def print_report(results):
+    print(f"\n{'='*60}")
+    print("⏱️  Pipeline stages")
+    print(f"{'='*60}")
+    for name, status, seconds in results:
+        print(f"   {name:12} {status:10} {seconds:8.1f} s")
+    print(f"   {'total':12} {'':10} {sum(seconds for _, _, seconds in results):8.1f} s (stage time)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the out-of-date data and model pipeline stages")
+    parser.add_argument('--force', nargs='*', metavar='STAGE',
+                        help="Rerun these stages even if up to date (all stages when none are named)")
+    parser.add_argument('--dry-run', action='store_true', help="Only report what would run")
+    parser.add_argument('--workers', type=int, default=None, help="Stages run at the same time")
+    args = parser.parse_args()
+
+    os.chdir(BACKEND_DIR)
+    force = args.force or []
+    if args.force == []:
+        force = [stage.name for stage in STAGES]
+    start = time.perf_counter()
+    results = run_pipeline(force=force, dry_run=args.dry_run, workers=args.workers)
+    print_report(results)
+    print(f"   Wall time: {time.perf_counter() - start:.1f} s")
+    if any(status in ('failed', 'blocked') for _, status, _ in results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
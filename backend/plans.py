@@ -0,0 +1,115 @@
+import itertools
+from collections import namedtuple
+
+import numpy as np
+
+# Taxes are this share of the gross premium, as in the get-quote breakdown
+TAX_RATE = 0.05
+ANNUAL_DISCOUNT = 0.9
+
+AddOn = namedtuple('AddOn', ['id', 'name', 'loading'])
+Plan = namedtuple('Plan', ['id', 'name', 'base', 'vehicle', 'included', 'coverage', 'cashless_garages'])
+
+# Loadings are shares of the model's risk premium. They are chosen so that
+# STANDARD reproduces the get-quote price and 60/25/10/5 breakdown exactly,
+# and BASIC/PREMIUM keep the 0.6x/1.6x ratios shown on ComparePlans.
+ADD_ONS = [
+    AddOn('roadside', '24/7 Roadside Assistance', 0.04),
+    AddOn('personalAccident', 'Personal Accident Cover', 0.06),
+    AddOn('zeroDepreciation', 'Zero Depreciation', 0.12),
+    AddOn('engineProtection', 'Engine Protection', 0.06),
+    AddOn('rental', 'Rental Car Coverage', 0.04)
+]
+
+PLANS = [
+    Plan('basic', 'BASIC', 0.40, 0.17, [],
+         {'liability': True, 'collision': False, 'comprehensive': False}, '500+'),
+    Plan('standard', 'STANDARD', 0.60, 0.25, ['roadside', 'personalAccident'],
+         {'liability': True, 'collision': True, 'comprehensive': False}, '3000+'),
+    Plan('premium', 'PREMIUM', 0.80, 0.40, [add_on.id for add_on in ADD_ONS],
+         {'liability': True, 'collision': True, 'comprehensive': True}, '5000+')
+]
+
+ADD_ON_IDS = [add_on.id for add_on in ADD_ONS]
+ADD_ON_LOADINGS = np.array([add_on.loading for add_on in ADD_ONS])
+
+def _combinations():
+    """Every plan with every subset of its optional add-ons
+
+    Returns the (plan index, add-on mask) of each combination; the plan's
+    included add-ons are always in the mask.
+    """
+    plan_rows, masks = [], []
+    for index, plan in enumerate(PLANS):
+        optional = [i for i, add_on_id in enumerate(ADD_ON_IDS) if add_on_id not in plan.included]
+        for size in range(len(optional) + 1):
+            for chosen in itertools.combinations(optional, size):
+                mask = np.array([add_on_id in plan.included for add_on_id in ADD_ON_IDS])
+                mask[list(chosen)] = True
+                plan_rows.append(index)
+                masks.append(mask)
+    return np.array(plan_rows), np.array(masks)
+
+# Static per-combination loadings; pricing a request is one multiply by the
+# risk premium
+COMBINATION_PLANS, COMBINATION_MASKS = _combinations()
+COMBINATION_BASE = np.array([PLANS[index].base for index in COMBINATION_PLANS])
+COMBINATION_VEHICLE = np.array([PLANS[index].vehicle for index in COMBINATION_PLANS])
+COMBINATION_ADDONS = COMBINATION_MASKS @ ADD_ON_LOADINGS
+
+def price_plans(risk_premium, selected_add_ons=()):
+    """Price every plan and add-on combination for one risk premium
+
+    Returns (plans, combinations): one entry per plan with its breakdown
+    including the selected optional add-ons, and every plan/add-on
+    combination with its monthly and yearly price.
+    """
+    base = COMBINATION_BASE * risk_premium
+    vehicle = COMBINATION_VEHICLE * risk_premium
+    addons = COMBINATION_ADDONS * risk_premium
+    net = base + vehicle + addons
+    monthly = net / (1 - TAX_RATE)
+    taxes = monthly - net
+    yearly = monthly * 12 * ANNUAL_DISCOUNT
+
+    selected = np.isin(ADD_ON_IDS, list(selected_add_ons))
+    combinations = []
+    plans = []
+    for row, (plan_index, mask) in enumerate(zip(COMBINATION_PLANS, COMBINATION_MASKS)):
+        plan = PLANS[plan_index]
+        add_on_ids = [add_on_id for add_on_id, chosen in zip(ADD_ON_IDS, mask) if chosen]
+        combinations.append({
+            "plan": plan.id,
+            "addOns": add_on_ids,
+            "monthlyPremium": round(float(monthly[row]), 2),
+            "yearlyPremium": round(float(yearly[row]), 2)
+        })
+
+        # The plan's headline price: included add-ons plus the selected ones
+        included = np.isin(ADD_ON_IDS, plan.included)
+        if np.array_equal(mask, included | selected):
+            plans.append({
+                "id": plan.id,
+                "name": plan.name,
+                "monthlyPremium": round(float(monthly[row]), 2),
+                "yearlyPremium": round(float(yearly[row]), 2),
+                "breakdown": {
+                    "base": round(float(base[row]), 2),
+                    "vehicle": round(float(vehicle[row]), 2),
+                    "addons": round(float(addons[row]), 2),
+                    "taxes": round(float(taxes[row]), 2)
+                },
+                "coverage": plan.coverage,
+                "cashlessGarages": plan.cashless_garages,
+                "includedAddOns": list(plan.included),
+                "selectedAddOns": [add_on_id for add_on_id in add_on_ids if add_on_id not in plan.included],
+                "optionalAddOns": [
+                    {
+                        "id": add_on.id,
+                        "name": add_on.name,
+                        "monthlyPrice": round(add_on.loading * risk_premium / (1 - TAX_RATE), 2)
+                    }
+                    for add_on in ADD_ONS if add_on.id not in plan.included
+                ]
+            })
+    return plans, combinations
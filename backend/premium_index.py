@@ -0,0 +1,92 @@
+import numpy as np
+
+class QuantileSketch:
+    """Compact, mergeable summary of a premium distribution
+
+    Keeps at most `resolution` weighted points, so ranks over tens of millions
+    of policies cost the same as over a few thousand, with a rank error of
+    roughly 1/resolution.
+    """
+
+    def __init__(self, resolution=2048):
+        self.resolution = resolution
+        self.values = np.empty(0)
+        self.weights = np.empty(0)
+
+    def update(self, premiums):
+        """Fold a chunk of premiums into the sketch"""
+        premiums = np.sort(np.asarray(premiums, dtype=float))
+        self._merge(premiums, np.ones(len(premiums)))
+        return self
+
+    def merge(self, other):
+        """Fold another sketch (e.g. from a different chunk or process) into this one"""
+        self._merge(other.values, other.weights)
+        return self
+
+    def _merge(self, values, weights):
+        values = np.concatenate([self.values, values])
+        weights = np.concatenate([self.weights, weights])
+        order = np.argsort(values, kind='mergesort')
+        values, weights = values[order], weights[order]
+
+        if len(values) > self.resolution:
+            # Collapse into `resolution` buckets of equal weight, each
+            # represented by its weighted mean value
+            cumulative = np.cumsum(weights)
+            bucket = np.minimum(
+                (cumulative - weights / 2) / cumulative[-1] * self.resolution,
+                self.resolution - 1
+            ).astype(int)
+            bucket_weights = np.bincount(bucket, weights=weights, minlength=self.resolution)
+            bucket_sums = np.bincount(bucket, weights=values * weights, minlength=self.resolution)
+            keep = bucket_weights > 0
+            values = bucket_sums[keep] / bucket_weights[keep]
+            weights = bucket_weights[keep]
+
+        self.values, self.weights = values, weights
+
+    @property
+    def count(self):
+        return float(self.weights.sum())
+
+    def rank(self, premium):
+        """Approximate number of premiums strictly below premium"""
+        if not len(self.values):
+            return 0.0
+        cumulative = np.cumsum(self.weights)
+        # Each point's weight is centred on its value
+        midpoints = cumulative - self.weights / 2
+        return float(np.interp(premium, self.values, midpoints, left=0.0, right=cumulative[-1]))
+
+class PremiumIndex:
+    """Presorted premiums for O(log n) percentile ranking
+
+    Ranks are found with a binary search instead of a full scan of the book.
+    With approximate=True the sorted array is replaced by a QuantileSketch.
+    """
+
+    def __init__(self, premiums, approximate=False, resolution=2048):
+        premiums = np.asarray(premiums, dtype=float)
+        self.approximate = approximate
+        self.resolution = resolution
+        self.overall = self._build(premiums)
+
+    def _build(self, premiums):
+        if self.approximate:
+            return QuantileSketch(self.resolution).update(premiums)
+        return np.sort(premiums)
+
+    @staticmethod
+    def _percentile(summary, premium):
+        if isinstance(summary, QuantileSketch):
+            total = summary.count
+            below = summary.rank(premium)
+        else:
+            total = len(summary)
+            below = np.searchsorted(summary, premium, side='left')
+        return float(below / total * 100) if total else None
+
+    def percentile(self, premium):
+        """Percentage of all reference premiums below premium"""
+        return self._percentile(self.overall, premium)
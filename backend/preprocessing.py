@@ -1,9 +1,23 @@
+import argparse
+import os
+
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 import joblib
-import os
+
+from table_store import write_table, compact_frame, default_formats, TableWriter, CHUNKED_FORMATS
+from features import (FeatureTransformer, CATEGORICAL_COLUMNS, NUMERIC_FEATURES, FEATURE_NAMES,
+                      TRANSFORMER_PATH, derive_columns, reference_year_of, check_parity)
+
+TARGET = 'monthly_premium'
+
+def add_engineered_features(df, reference_year):
+    """Add vehicle_age, age_group, vehicle_category, high_mileage and old_vehicle to df"""
+    for name, values in derive_columns(df, reference_year).items():
+        df[name] = values
+    return df
 
 def preprocess_data():
     """Load and preprocess insurance data for ML"""
@@ -44,75 +58,32 @@ def preprocess_data():
     # Feature Engineering
     print(f"\n🔧 Feature Engineering...")
     
-    # Age groups
-    def categorize_age(age):
-        if age <= 25:
-            return 'Young (18-25)'
-        elif age <= 40:
-            return 'Adult (26-40)'
-        elif age <= 55:
-            return 'Middle (41-55)'
-        else:
-            return 'Senior (56+)'
-    
-    df['age_group'] = df['age'].apply(categorize_age)
-    
-    # Vehicle category
-    def categorize_vehicle(make):
-        economy = ['Maruti', 'Tata']
-        luxury = ['BMW', 'Mercedes', 'Audi']
-        if make in economy:
-            return 'Economy'
-        elif make in luxury:
-            return 'Luxury'
-        else:
-            return 'Mid-range'
-    
-    df['vehicle_category'] = df['vehicle_make'].apply(categorize_vehicle)
-    
-    # High mileage flag
-    df['high_mileage'] = (df['annual_mileage'] > 20000).astype(int)
-    
-    # Old vehicle flag
-    df['old_vehicle'] = (df['vehicle_age'] > 7).astype(int)
+    reference_year = reference_year_of(df['vehicle_year'], df['vehicle_age'])
+    add_engineered_features(df, reference_year)
     
     print(f"   ✓ Created age_group, vehicle_category, high_mileage, old_vehicle")
+    print(f"   ✓ Vehicle ages counted from {reference_year}")
     
     # Prepare features for ML
     print(f"\n🎯 Preparing features for ML...")
     
-    # Create copy for encoding
-    df_encoded = df.copy()
-    
     # Encode categorical variables
-    encoders = {}
-    categorical_cols = ['sex', 'smoker', 'region', 'vehicle_make', 'usage_type', 
-                       'fuel_type', 'age_group', 'vehicle_category']
-    
-    for col in categorical_cols:
-        le = LabelEncoder()
-        df_encoded[col + '_encoded'] = le.fit_transform(df_encoded[col])
-        encoders[col] = le
-    
-    print(f"   ✓ Encoded {len(categorical_cols)} categorical features")
-    
-    # Select features for training
-    feature_cols = [
-        'age', 'bmi', 'children', 'annual_mileage', 'vehicle_age',
-        'sex_encoded', 'smoker_encoded', 'region_encoded',
-        'vehicle_make_encoded', 'usage_type_encoded', 'fuel_type_encoded',
-        'age_group_encoded', 'vehicle_category_encoded',
-        'high_mileage', 'old_vehicle'
-    ]
-    
-    X = df_encoded[feature_cols]
-    y = df_encoded['monthly_premium']
-    
-    # Scale numerical features
+    encoders = {col: LabelEncoder().fit(df[col]) for col in CATEGORICAL_COLUMNS}
+    feature_cols = FEATURE_NAMES
+    
+    print(f"   ✓ Encoded {len(CATEGORICAL_COLUMNS)} categorical features")
+    
+    X = FeatureTransformer.from_fitted(encoders, None, reference_year).features(df)
+    y = df[TARGET]
+    
+    # Scale numerical features; the fitted transformer is what serving uses
     print(f"\n⚖️ Scaling features...")
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
-    X_scaled = pd.DataFrame(X_scaled, columns=feature_cols)
+    # Column-major, as a DataFrame is, so the moments are summed in the same order
+    scaler = StandardScaler().fit(np.asfortranarray(X))
+    scaler.feature_names_in_ = np.array(feature_cols, dtype=object)
+    transformer = FeatureTransformer.from_fitted(encoders, scaler, reference_year)
+    X_scaled = pd.DataFrame(transformer.scale(X), columns=feature_cols)
+    print(f"   ✓ Serving features match training on {check_parity(transformer, df):,} rows")
     
     # Train-test split
     print(f"\n✂️ Splitting data (80-20)...")
@@ -130,17 +101,18 @@ def preprocess_data():
     joblib.dump(scaler, 'models/scaler.pkl')
     joblib.dump(encoders, 'models/encoders.pkl')
     joblib.dump(feature_cols, 'models/feature_names.pkl')
+    transformer.save(TRANSFORMER_PATH)
     
-    # Save train-test data
-    X_train.to_csv('data/X_train.csv', index=False)
-    X_test.to_csv('data/X_test.csv', index=False)
-    y_train.to_csv('data/y_train.csv', index=False)
-    y_test.to_csv('data/y_test.csv', index=False)
+    # Save train-test data (formats from DATA_FORMAT, see table_store.py)
+    write_table(X_train, 'data/X_train')
+    write_table(X_test, 'data/X_test')
+    write_table(y_train, 'data/y_train')
+    write_table(y_test, 'data/y_test')
     
     # Save full processed dataset
-    df.to_csv('data/insurance_processed.csv', index=False)
+    write_table(df, 'data/insurance_processed')
     
-    print(f"   ✓ Saved scaler, encoders, feature names")
+    print(f"   ✓ Saved scaler, encoders, feature names, feature transformer")
     print(f"   ✓ Saved train-test splits")
     print(f"   ✓ Saved processed dataset")
     
@@ -149,5 +121,186 @@ def preprocess_data():
     
     return X_train, X_test, y_train, y_test
 
+def read_chunks(source, chunk_size):
+    """DataFrames of at most chunk_size rows from a CSV file, or the
+    partitions of a synthetic_data.py output directory"""
+    if os.path.isdir(source):
+        from synthetic_data import iter_policy_chunks
+        for chunk in iter_policy_chunks(source):
+            for start in range(0, len(chunk), chunk_size):
+                part = chunk.iloc[start:start + chunk_size].reset_index(drop=True)
+                yield part.astype({name: object for name in part.columns
+                                   if isinstance(part[name].dtype, pd.CategoricalDtype)})
+    else:
+        yield from pd.read_csv(source, chunksize=chunk_size)
+
+def fit_scaler(numeric_scaler, category_counts, encoders):
+    """StandardScaler over FEATURE_NAMES from the streamed statistics
+
+    numeric_scaler was partial_fit on NUMERIC_FEATURES. The label codes
+    are only known once every category has been seen, so the moments of
+    the encoded columns come from the category counts instead: code i of
+    a column appears as often as its i-th (sorted) category.
+    """
+    rows = numeric_scaler.n_samples_seen_
+    if not np.isscalar(rows):
+        rows = rows.max()
+    numeric = {name: i for i, name in enumerate(NUMERIC_FEATURES)}
+    mean = np.empty(len(FEATURE_NAMES))
+    var = np.empty(len(FEATURE_NAMES))
+    for i, name in enumerate(FEATURE_NAMES):
+        if name in numeric:
+            mean[i] = numeric_scaler.mean_[numeric[name]]
+            var[i] = numeric_scaler.var_[numeric[name]]
+        else:
+            column = name[:-len('_encoded')]
+            counts = category_counts[column].reindex(encoders[column].classes_).to_numpy(dtype=float)
+            codes = np.arange(len(counts), dtype=float)
+            mean[i] = counts @ codes / counts.sum()
+            var[i] = counts @ (codes - mean[i]) ** 2 / counts.sum()
+
+    scaler = StandardScaler()
+    scaler.mean_ = mean
+    scaler.var_ = var
+    scale = np.sqrt(var)
+    scale[scale == 0] = 1.0
+    scaler.scale_ = scale
+    scaler.n_samples_seen_ = rows
+    scaler.n_features_in_ = len(FEATURE_NAMES)
+    scaler.feature_names_in_ = np.array(FEATURE_NAMES, dtype=object)
+    return scaler
+
+def preprocess_data_streaming(source='data/insurance.csv', chunk_size=100_000, test_size=0.2,
+                              random_state=42):
+    """preprocess_data() in two passes over chunks of the dataset
+
+    Pass 1 collects the categories, the column dtypes and the fill values
+    and partial_fits the scaler; pass 2 transforms every chunk and writes it
+    straight into the processed table and the train/test split. Peak memory
+    is a few chunks, whatever the size of the dataset.
+
+    Differences from preprocess_data(): numeric gaps are filled with the
+    column mean (a median needs the whole column) and the scaler is fitted
+    on the values before filling; the test rows are an exact
+    `test_size` share drawn chunk by chunk, so they are not the rows
+    train_test_split would pick.
+    """
+    formats = default_formats()
+    unsupported = [name for name in formats if name not in CHUNKED_FORMATS]
+    if unsupported:
+        raise ValueError(f"Streaming preprocessing writes {' and '.join(CHUNKED_FORMATS)}, "
+                         f"not {', '.join(unsupported)} (DATA_FORMAT)")
+
+    print(f"📂 Streaming {source} in chunks of {chunk_size:,} rows...")
+
+    # Pass 1: statistics
+    print(f"\n🔍 Pass 1: categories, dtypes and scaler statistics...")
+    numeric_scaler = StandardScaler()
+    category_counts = {}
+    sums = {}
+    dtypes = {}
+    columns = []
+    reference_years = set()
+    rows = 0
+    for chunk in read_chunks(source, chunk_size):
+        rows += len(chunk)
+        for name in chunk.columns:
+            if chunk[name].dtype == object:
+                continue
+            total, count = sums.get(name, (0.0, 0))
+            sums[name] = (total + chunk[name].sum(), count + int(chunk[name].count()))
+        reference_year = reference_year_of(chunk['vehicle_year'], chunk['vehicle_age'])
+        reference_years.add(reference_year)
+        add_engineered_features(chunk, reference_year)
+        columns = columns or list(chunk.columns)
+        for name, dtype in compact_frame(chunk).dtypes.items():
+            if isinstance(dtype, pd.CategoricalDtype):
+                counts = chunk[name].value_counts()
+                category_counts[name] = counts.add(category_counts[name], fill_value=0) \
+                    if name in category_counts else counts
+            else:
+                dtypes[name] = np.promote_types(dtypes[name], dtype) if name in dtypes else dtype
+        numeric_scaler.partial_fit(chunk[NUMERIC_FEATURES])
+
+    print(f"   ✓ {rows:,} records")
+    if len(reference_years) != 1:
+        raise ValueError(f"vehicle_age is not counted from a single year ({sorted(reference_years)})")
+    fill_values = {name: total / count for name, (total, count) in sums.items() if count}
+    for name, counts in category_counts.items():
+        # Most frequent category, the smallest one on ties (as Series.mode())
+        fill_values[name] = counts.sort_index().idxmax()
+    encoders = {col: LabelEncoder().fit(category_counts[col].index.to_numpy())
+                for col in CATEGORICAL_COLUMNS}
+    scaler = fit_scaler(numeric_scaler, category_counts, encoders)
+    transformer = FeatureTransformer.from_fitted(encoders, scaler, reference_year)
+
+    # Pass 2: transform and write
+    print(f"\n✂️ Pass 2: transforming and splitting ({1 - test_size:.0%}/{test_size:.0%})...")
+    test_rows = int(np.ceil(test_size * rows))
+    train_rows = rows - test_rows
+    # Processed table columns as compact_frame() would store the whole table
+    processed_columns = {
+        name: sorted(category_counts[name].index) if name in category_counts else dtypes[name]
+        for name in columns
+    }
+    feature_columns = {name: np.float64 for name in FEATURE_NAMES}
+    writers = {
+        'processed': TableWriter('data/insurance_processed', rows, processed_columns, formats),
+        'X_train': TableWriter('data/X_train', train_rows, feature_columns, formats),
+        'X_test': TableWriter('data/X_test', test_rows, feature_columns, formats),
+        'y_train': TableWriter('data/y_train', train_rows, {TARGET: np.float64}, formats),
+        'y_test': TableWriter('data/y_test', test_rows, {TARGET: np.float64}, formats)
+    }
+
+    rng = np.random.default_rng(random_state)
+    seen = 0
+    test_left = test_rows
+    parity_rows = 0
+    for chunk in read_chunks(source, chunk_size):
+        chunk = chunk.fillna(fill_values)
+        add_engineered_features(chunk, reference_year)
+        X_scaled = pd.DataFrame(transformer.transform(chunk), columns=FEATURE_NAMES)
+        if not parity_rows:
+            parity_rows = check_parity(transformer, chunk)
+        y = chunk[[TARGET]]
+
+        # Test rows drawn without replacement across chunks: this chunk's
+        # share of the remaining test rows is hypergeometric
+        in_test = rng.hypergeometric(test_left, rows - seen - test_left, len(chunk)) if test_left else 0
+        test = np.zeros(len(chunk), dtype=bool)
+        test[rng.choice(len(chunk), in_test, replace=False)] = True
+        seen += len(chunk)
+        test_left -= in_test
+
+        writers['processed'].write(chunk)
+        writers['X_train'].write(X_scaled[~test])
+        writers['X_test'].write(X_scaled[test])
+        writers['y_train'].write(y[~test])
+        writers['y_test'].write(y[test])
+
+    for writer in writers.values():
+        writer.close()
+    print(f"   Training set: {train_rows:,} records")
+    print(f"   Test set: {test_rows:,} records")
+    print(f"   ✓ Serving features match training on {parity_rows:,} rows")
+
+    os.makedirs('models', exist_ok=True)
+    joblib.dump(scaler, 'models/scaler.pkl')
+    joblib.dump(encoders, 'models/encoders.pkl')
+    joblib.dump(FEATURE_NAMES, 'models/feature_names.pkl')
+    transformer.save(TRANSFORMER_PATH)
+
+    print(f"\n✅ Preprocessing complete!")
+    print(f"   Ready for model training with {len(FEATURE_NAMES)} features")
+
 if __name__ == "__main__":
-    preprocess_data()
+    parser = argparse.ArgumentParser(description="Preprocess the insurance dataset for training")
+    parser.add_argument('--chunk-size', type=int,
+                        help="Stream the dataset in chunks of this many rows (two passes, bounded memory)")
+    parser.add_argument('--source', default='data/insurance.csv',
+                        help="CSV file or synthetic_data.py output directory (streaming mode)")
+    args = parser.parse_args()
+    if args.chunk_size:
+        preprocess_data_streaming(args.source, args.chunk_size)
+    else:
+        preprocess_data()
@@ -0,0 +1,624 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from segment_stats import SegmentStats, mileage_band, HIGH_MILEAGE_THRESHOLD
+from premium_index import PremiumIndex
+from features import FeatureTransformer, ECONOMY_MAKES, vehicle_category_for
+from tree_engine import CompiledEnsemble
+from artifact_bundle import (ServingBundle, BundleFormatError, file_version, load_reference_table,
+                             load_reference_features)
+from neighbors import KDTree
+from quote_cache import QuoteCache
+from plans import ADD_ON_IDS, price_plans
+from metrics import StageTimer
+from validation import QuoteRequestError, QuoteValidator, CATEGORICAL_FIELDS, FIELD_RANGES, QUOTE_FIELDS
+
+# Directory holding models/, data/ and visualization_data/
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+MAX_BATCH_SIZE = 50000
+
+# Latest model year in the training data (data_download.py draws 2015-2024)
+NEWEST_VEHICLE_YEAR = 2024
+
+# What-if sweeps: dimensions that can be swept, their allowed ranges, and
+# the largest grid (all dimensions combined) priced in one request
+SWEEP_RANGES = {field: FIELD_RANGES[field] for field in ['annual_mileage', 'vehicle_year', 'age']}
+MAX_SWEEP_DIMENSIONS = 2
+MAX_SWEEP_POINTS = 2500
+
+# Profile priced by warm_up()
+WARM_UP_PROFILE = {
+    'age': 30, 'sex': 'male', 'smoker': 'no', 'vehicle_make': 'Toyota',
+    'vehicle_year': 2020, 'annual_mileage': 15000, 'usage_type': 'Personal',
+    'fuel_type': 'Petrol'
+}
+
+class QuoteEngine:
+    """Pricing logic shared by the Flask backend and the serverless entry point
+
+    Artifacts are loaded on first use (or by load()/warm_up()), so importing
+    this module costs only NumPy; pandas, joblib and scikit-learn are
+    imported only when the serving bundle is missing or stale.
+    """
+
+    def __init__(self, base_dir=BACKEND_DIR, precision='float64', premium_index_mode='exact',
+                 cache_size=10000, cache_ttl=300, sweep_cache_size=256, models_dir=None,
+                 similar_drivers=50):
+        self.base_dir = base_dir
+        # models/ by default, or one version directory of the model registry
+        self.models_dir = models_dir or os.path.join(base_dir, 'models')
+        self.reference_path = os.path.join(base_dir, 'data', 'insurance_processed')
+        self.precision = precision
+        self.premium_index_mode = premium_index_mode
+        # Nearest reference policies the comparison is computed from
+        self.similar_drivers = similar_drivers
+        # In-process LRU cache of assembled quotes, keyed on the feature vector
+        self.quote_cache = QuoteCache(max_entries=cache_size, ttl_seconds=cache_ttl)
+        # What-if grids for popular base profiles, keyed on profile and sweep
+        self.sweep_cache = QuoteCache(max_entries=sweep_cache_size, ttl_seconds=cache_ttl)
+        self.bundle = None
+        self.artifact_source = None
+        self.model_version = None
+        self.loaded = False
+        self._load_lock = threading.Lock()
+        # Replaced by a MicroBatcher's predict when micro-batching is enabled
+        self.quote_batcher = None
+        self.predict_quote = self.predict
+
+    @classmethod
+    def from_environ(cls, base_dir=BACKEND_DIR, models_dir=None):
+        """Build an engine configured from the documented environment variables"""
+        return cls(
+            base_dir,
+            models_dir=models_dir,
+            # MODEL_PRECISION=float32 evaluates the compiled trees in single precision
+            precision=os.environ.get('MODEL_PRECISION', 'float64'),
+            # 'approximate' ranks against compact quantile sketches instead of the full
+            # sorted premium arrays (for reference books of tens of millions of policies)
+            premium_index_mode=os.environ.get('PREMIUM_INDEX_MODE', 'exact'),
+            # QUOTE_CACHE_SIZE=0 disables the quote cache
+            cache_size=int(os.environ.get('QUOTE_CACHE_SIZE', 10000)),
+            cache_ttl=float(os.environ.get('QUOTE_CACHE_TTL', 300)),
+            sweep_cache_size=int(os.environ.get('SWEEP_CACHE_SIZE', 256)),
+            similar_drivers=int(os.environ.get('SIMILAR_DRIVERS', 50))
+        )
+
+    def open_serving_bundle(self):
+        """Open models/serving_bundle.bin if it matches the pickled artifacts and reference data"""
+        path = os.path.join(self.models_dir, 'serving_bundle.bin')
+        if not os.path.exists(path):
+            return None
+        try:
+            bundle = ServingBundle(path)
+        except (BundleFormatError, OSError, ValueError) as e:
+            print(f"⚠️ Ignoring serving bundle: {e}")
+            return None
+
+        changed = bundle.changed_sources(self.models_dir, os.path.dirname(self.reference_path))
+        if changed:
+            print(f"⚠️ Ignoring serving bundle: {', '.join(changed)} changed since it was built")
+            return None
+        return bundle
+
+    def load_model_artifacts(self):
+        """(Re)load the ML model and preprocessing artifacts
+
+        Uses the memory-mapped serving bundle when it is present and current,
+        otherwise unpickles the individual joblib files.
+        """
+        bundle = self.open_serving_bundle()
+        model_path = os.path.join(self.models_dir, 'premium_predictor.pkl')
+        if bundle is not None:
+            self.model = bundle.load_model(dtype=self.precision, fallback_path=model_path)
+            self.transformer = bundle.load_transformer()
+            self.model_version = bundle.model_version
+            self.artifact_source = f"serving bundle {bundle.model_version}"
+        else:
+            import joblib
+            self.model = CompiledEnsemble.from_model(joblib.load(model_path), dtype=self.precision)
+            self.transformer = FeatureTransformer.load_artifacts(self.models_dir)
+            self.model_version = file_version(model_path)
+            self.artifact_source = "pickled artifacts"
+        self.bundle = bundle
+        self.encoders = self.transformer.encoders
+        self.feature_names = self.transformer.feature_names
+        self.validator = QuoteValidator(self.encoders.to_classes())
+        self.quote_cache.clear()
+        self.sweep_cache.clear()
+
+    def load_reference_data(self, path=None):
+        """(Re)load the reference policies and rebuild the segment statistics
+
+        Without a path the reference columns and the similar-driver index come
+        from the serving bundle when one is loaded; otherwise they are built
+        from the processed dataset in data/ (see table_store.py).
+        """
+        if path is None and self.bundle is not None:
+            self.reference = self.bundle.load_reference()
+            self.neighbor_index = self.bundle.load_neighbor_index()
+        else:
+            path = path or self.reference_path
+            self.reference = load_reference_table(path)
+            self.neighbor_index = KDTree.build(load_reference_features(self.transformer, path))
+        self.segment_stats = SegmentStats(self.reference)
+        self.premium_index = PremiumIndex(
+            self.reference['monthly_premium'],
+            approximate=self.premium_index_mode == 'approximate'
+        )
+        self.quote_cache.clear()
+
+    def load(self):
+        """Load the model artifacts and reference data"""
+        with self._load_lock:
+            self.load_model_artifacts()
+            self.load_reference_data()
+            self.loaded = True
+        return self
+
+    def ensure_loaded(self):
+        """Load on first use; safe to call from concurrent requests"""
+        if not self.loaded:
+            with self._load_lock:
+                if not self.loaded:
+                    self.load_model_artifacts()
+                    self.load_reference_data()
+                    self.loaded = True
+        return self
+
+    def warm_up(self):
+        """Load everything and price one profile so the first real quote is fast
+
+        Returns the time taken in milliseconds.
+        """
+        began = time.perf_counter()
+        self.ensure_loaded()
+        scaled_features, _, _ = self.prepare_features(self.validate(WARM_UP_PROFILE))
+        self.predict(scaled_features)
+        return (time.perf_counter() - began) * 1000
+
+    def enable_micro_batching(self, batcher_class, **options):
+        """Route single-quote predictions through a micro-batcher"""
+        self.quote_batcher = batcher_class(self.predict, **options)
+        self.predict_quote = self.quote_batcher.predict
+        return self.quote_batcher
+
+    @property
+    def reference_rows(self):
+        self.ensure_loaded()
+        return len(self.reference['monthly_premium'])
+
+    def predict(self, features):
+        return self.model.predict(features)
+
+    def validate(self, user_data):
+        """QuoteRecord for a request body; raises QuoteRequestError listing every problem"""
+        self.ensure_loaded()
+        if not isinstance(user_data, dict):
+            raise QuoteRequestError("Request body must be a JSON object")
+        return self.validator.validate(user_data)
+
+    def prepare_features(self, record):
+        """Scaled model features of a validated QuoteRecord, with its age group and vehicle category"""
+        return self.transformer.transform_record(record)
+
+    def prepare_features_records(self, records):
+        """Prepare many validated QuoteRecords for a single vectorized model prediction
+
+        Returns the scaled feature matrix and the age_group and
+        vehicle_category arrays.
+        """
+        columns = {
+            field: np.fromiter((getattr(record, field) for record in records),
+                               dtype=object if field in CATEGORICAL_FIELDS else float, count=len(records))
+            for field in QUOTE_FIELDS
+        }
+        features = self.transformer.features(columns)
+        age_group, vehicle_category = self.transformer.segments(features)
+        return self.transformer.scale(features), age_group, vehicle_category
+
+    def comparison(self, scaled_features, monthly_premium):
+        """How a premium compares with the most similar policies and the whole book
+
+        Similar drivers are the `similar_drivers` reference policies nearest
+        to the applicant in the model's scaled feature space.
+        """
+
+        # Find similar profiles
+        _, rows = self.neighbor_index.query(scaled_features[0], self.similar_drivers)
+        similar = np.asarray(self.reference['monthly_premium'])[rows]
+        similar_avg = float(similar.mean())
+        similar_min = float(similar.min())
+        similar_max = float(similar.max())
+
+        # Calculate percentile
+        percentile = self.premium_index.percentile(monthly_premium)
+        similar_percentile = float((similar < monthly_premium).mean() * 100)
+        cheaper = monthly_premium < similar_avg
+        share = 100 - similar_percentile if cheaper else similar_percentile
+
+        return {
+            "message": f"You're paying {'LESS' if cheaper else 'MORE'} than {share:.0f}% of similar drivers!",
+            "percentile": round(percentile, 1),
+            "similarPercentile": round(similar_percentile, 1),
+            "similarProfiles": {
+                "count": len(similar),
+                "average": round(similar_avg, 2),
+                "range": f"₹{similar_min:.0f}-₹{similar_max:.0f}/month"
+            }
+        }
+
+    def quote(self, user_data, timer=None):
+        """Price one applicant and assemble the get-quote response
+
+        Raises QuoteRequestError for missing, malformed or out-of-range fields
+        and unknown categories. Pass a StageTimer to collect per-stage
+        latencies.
+        """
+        timer = timer or StageTimer()
+
+        # Validate and coerce the request
+        record = self.validate(user_data)
+        segment_stats = self.segment_stats
+        timer.lap('validation')
+
+        # Prepare features
+        scaled_features, age_group, vehicle_category = self.prepare_features(record)
+        timer.lap('prepare_features')
+
+        # Identical feature vectors get identical quotes
+        cache_key = tuple(scaled_features[0].tolist())
+        cached = self.quote_cache.get(cache_key)
+        timer.lap('cache_lookup')
+        if cached is not None:
+            return cached
+
+        # Predict premium
+        monthly_premium = self.predict_quote(scaled_features)[0]
+        timer.lap('predict')
+        yearly_premium = monthly_premium * 12 * 0.9  # 10% annual discount
+
+        # Calculate breakdown (simplified)
+        base_premium = monthly_premium * 0.60
+        vehicle_premium = monthly_premium * 0.25
+        addon_premium = monthly_premium * 0.10
+        tax_premium = monthly_premium * 0.05
+
+        # Compare with similar profiles
+        comparison = self.comparison(scaled_features, monthly_premium)
+        timer.lap('segment_stats')
+
+        # Price factors
+        factors = []
+
+        # Age factor
+        avg_by_age = segment_stats.mean('age_group', age_group)
+        overall_avg = segment_stats.overall.mean
+        age_impact = avg_by_age - overall_avg
+        if abs(age_impact) > 50:
+            factors.append({
+                "factor": f"Your age ({record.age})",
+                "impact": f"{'Adds' if age_impact > 0 else 'Saves'} ₹{abs(age_impact):.0f}/month",
+                "type": "negative" if age_impact > 0 else "positive"
+            })
+
+        # Vehicle factor
+        avg_by_vehicle = segment_stats.mean('vehicle_make', record.vehicle_make)
+        vehicle_impact = avg_by_vehicle - overall_avg
+        if abs(vehicle_impact) > 50:
+            factors.append({
+                "factor": f"Vehicle ({record.vehicle_make})",
+                "impact": f"{'Adds' if vehicle_impact > 0 else 'Saves'} ₹{abs(vehicle_impact):.0f}/month",
+                "type": "negative" if vehicle_impact > 0 else "positive"
+            })
+
+        # Smoking factor
+        smoker_avg = segment_stats.mean('smoker', 'yes')
+        nonsmoker_avg = segment_stats.mean('smoker', 'no')
+        if record.smoker == 'yes':
+            smoker_impact = smoker_avg - nonsmoker_avg
+            factors.append({
+                "factor": "Smoker",
+                "impact": f"Adds ₹{smoker_impact:.0f}/month",
+                "type": "negative"
+            })
+        else:
+            nonsmoker_impact = nonsmoker_avg - smoker_avg
+            factors.append({
+                "factor": "Non-smoker",
+                "impact": f"Saves ₹{abs(nonsmoker_impact):.0f}/month",
+                "type": "positive"
+            })
+
+        # Mileage factor
+        if mileage_band(record.annual_mileage) == 'high':
+            high_mileage_avg = segment_stats.mean('mileage_band', 'high')
+            low_mileage_avg = segment_stats.mean('mileage_band', 'low')
+            mileage_impact = high_mileage_avg - low_mileage_avg
+            factors.append({
+                "factor": "High mileage",
+                "impact": f"Adds ₹{mileage_impact:.0f}/month",
+                "type": "negative"
+            })
+        timer.lap('factors')
+
+        # Build response
+        response = {
+            "monthlyPremium": round(monthly_premium, 2),
+            "yearlyPremium": round(yearly_premium, 2),
+            "breakdown": {
+                "base": round(base_premium, 2),
+                "vehicle": round(vehicle_premium, 2),
+                "addons": round(addon_premium, 2),
+                "taxes": round(tax_premium, 2)
+            },
+            "factors": factors,
+            "comparison": comparison,
+            "features": {
+                "liability": "Up to ₹15 Lakh",
+                "collision": "Included",
+                "roadside": "24/7 Assistance",
+                "cashless": "5000+ garages",
+                "accident": "Personal Accident Cover"
+            }
+        }
+
+        self.quote_cache.put(cache_key, response)
+        return response
+
+    def quote_batch(self, records):
+        """Price many applicants with a single model prediction
+
+        Invalid records get an error entry instead of failing the batch; a
+        body that is not a usable list raises QuoteRequestError.
+        """
+        if not isinstance(records, list) or not records:
+            raise QuoteRequestError("Request body must be a non-empty list of records")
+        if len(records) > MAX_BATCH_SIZE:
+            raise QuoteRequestError(f"Batch too large: maximum is {MAX_BATCH_SIZE} records")
+
+        self.ensure_loaded()
+        quote_records, failures = self.validator.validate_many(records)
+        results = [None] * len(records)
+        for index, errors in failures.items():
+            results[index] = {"index": index, "error": errors[0]["message"], "errors": errors}
+
+        positions = [index for index, record in enumerate(quote_records) if record is not None]
+        if positions:
+            scaled_features, age_groups, vehicle_categories = \
+                self.prepare_features_records([quote_records[index] for index in positions])
+
+            # Predict all premiums in one call
+            monthly_premiums = self.predict(scaled_features)
+            yearly_premiums = monthly_premiums * 12 * 0.9  # 10% annual discount
+
+            for row, index in enumerate(positions):
+                results[index] = {
+                    "index": index,
+                    "monthlyPremium": round(float(monthly_premiums[row]), 2),
+                    "yearlyPremium": round(float(yearly_premiums[row]), 2),
+                    "ageGroup": str(age_groups[row]),
+                    "vehicleCategory": str(vehicle_categories[row])
+                }
+
+        failed = len(failures)
+
+        return {
+            "results": results,
+            "count": len(results),
+            "succeeded": len(results) - failed,
+            "failed": failed
+        }
+
+    def savings_tips(self, user_data):
+        """Personalized savings tips from re-pricing the applicant
+
+        Each counterfactual (economy make, quitting smoking, lower mileage
+        band, electric fuel, personal usage, newer vehicle, and all of them
+        together with the cheapest economy make) is priced alongside the
+        applicant in one batched predict, and tips are ranked by predicted
+        monthly savings.
+        """
+        record = self.validate(user_data)
+
+        # (tip, changes to the applicant's profile)
+        candidates = []
+        if vehicle_category_for(record.vehicle_make) != 'Economy':
+            for make in ECONOMY_MAKES:
+                candidates.append((f"Switch to an economy vehicle ({make})", {'vehicle_make': make}))
+        if record.smoker == 'yes':
+            candidates.append(("Quit smoking", {'smoker': 'no'}))
+        if mileage_band(record.annual_mileage) == 'high':
+            candidates.append(("Reduce annual mileage below 20,000 km",
+                               {'annual_mileage': HIGH_MILEAGE_THRESHOLD}))
+        if record.fuel_type != 'Electric':
+            candidates.append(("Consider an electric vehicle", {'fuel_type': 'Electric'}))
+        if record.usage_type != 'Personal':
+            candidates.append(("Switch to personal use only", {'usage_type': 'Personal'}))
+        if record.vehicle_year < NEWEST_VEHICLE_YEAR:
+            candidates.append((f"Upgrade to a {NEWEST_VEHICLE_YEAR} model year vehicle",
+                               {'vehicle_year': NEWEST_VEHICLE_YEAR}))
+
+        # Every change at once, priced with each economy make so the total
+        # can use the cheapest one
+        combined = {}
+        for _, changes in candidates:
+            combined.update(changes)
+        economy_makes = [changes['vehicle_make'] for _, changes in candidates if 'vehicle_make' in changes]
+        combined_changes = [dict(combined, vehicle_make=make) for make in economy_makes] or [combined]
+
+        # Row 0 is the applicant as-is, then the candidates, then the combined rows
+        profiles = [record] + [record.replace(**changes) for _, changes in candidates]
+        profiles += [record.replace(**changes) for changes in combined_changes]
+
+        features = np.vstack([self.prepare_features(profile)[0] for profile in profiles])
+        premiums = self.predict(features)
+        current_premium = float(premiums[0])
+
+        # Keep the cheapest economy make only
+        best = {}
+        for (tip, changes), premium in zip(candidates, premiums[1:len(candidates) + 1]):
+            kind = tuple(changes)
+            if kind not in best or premium < best[kind][1]:
+                best[kind] = (tip, float(premium), changes)
+
+        tips = []
+        for tip, premium, _ in best.values():
+            savings = current_premium - premium
+            if savings <= 0:
+                continue
+            share = savings / current_premium
+            tips.append({
+                "tip": tip,
+                "savings": f"₹{savings:.0f}/month",
+                "monthlySavings": round(savings, 2),
+                "newPremium": round(premium, 2),
+                "impact": "high" if share >= 0.15 else "medium" if share >= 0.05 else "low"
+            })
+        tips.sort(key=lambda tip: tip['monthlySavings'], reverse=True)
+
+        combined_premiums = premiums[len(candidates) + 1:]
+        if economy_makes:
+            cheapest_make = best[('vehicle_make',)][2]['vehicle_make']
+            combined_premium = combined_premiums[economy_makes.index(cheapest_make)]
+        else:
+            combined_premium = combined_premiums[0]
+        combined_savings = current_premium - float(combined_premium) if candidates else 0.0
+
+        return {
+            "currentPremium": round(current_premium, 2),
+            "tips": tips,
+            "totalPotentialSavings": round(max(combined_savings, 0.0), 2)
+        }
+
+    def compare_plans(self, user_data):
+        """Price every plan tier and add-on combination for one applicant
+
+        Features, the model prediction and the similar-profile lookup are
+        computed once and shared; the tiers are loadings on that risk
+        premium, evaluated together in plans.price_plans.
+        """
+        record = self.validate(user_data)
+        selected_add_ons = user_data.get('addons', [])
+        if not isinstance(selected_add_ons, list):
+            raise QuoteRequestError("addons must be a list of add-on ids")
+        unknown = [add_on for add_on in selected_add_ons if add_on not in ADD_ON_IDS]
+        if unknown:
+            raise QuoteRequestError(
+                f"Unknown add-on: {unknown[0]!r}; choose from {', '.join(ADD_ON_IDS)}"
+            )
+
+        scaled_features, age_group, vehicle_category = self.prepare_features(record)
+        risk_premium = float(self.predict_quote(scaled_features)[0])
+        plans, combinations = price_plans(risk_premium, selected_add_ons)
+
+        return {
+            "riskPremium": round(risk_premium, 2),
+            "ageGroup": age_group,
+            "vehicleCategory": vehicle_category,
+            "plans": plans,
+            "combinations": combinations,
+            "comparison": self.comparison(scaled_features, risk_premium)
+        }
+
+    def parse_sweep(self, sweep):
+        """Validate sweep dimensions into [(field, values array)]
+
+        Each dimension is {"field", "values": [...]} or {"field", "min",
+        "max", "steps"}; raises QuoteRequestError for anything unusable.
+        """
+        if isinstance(sweep, dict):
+            sweep = [sweep]
+        if not isinstance(sweep, list) or not 1 <= len(sweep) <= MAX_SWEEP_DIMENSIONS:
+            raise QuoteRequestError(f"sweep must list 1 to {MAX_SWEEP_DIMENSIONS} dimensions")
+
+        dimensions = []
+        for dimension in sweep:
+            field = dimension.get('field') if isinstance(dimension, dict) else None
+            if field not in SWEEP_RANGES:
+                raise QuoteRequestError(
+                    f"Cannot sweep field {field!r}; choose from {', '.join(SWEEP_RANGES)}"
+                )
+            if field in (name for name, _ in dimensions):
+                raise QuoteRequestError(f"Field {field} is swept twice")
+            try:
+                if 'values' in dimension:
+                    values = np.asarray(dimension['values'], dtype=float)
+                else:
+                    start, stop, steps = float(dimension['min']), float(dimension['max']), int(dimension['steps'])
+            except (KeyError, TypeError, ValueError, OverflowError):
+                raise QuoteRequestError(
+                    f"Sweep over {field} needs 'values' or numeric 'min', 'max' and 'steps'"
+                ) from None
+            if 'values' not in dimension:
+                if not 1 <= steps <= MAX_SWEEP_POINTS:
+                    raise QuoteRequestError(f"steps for {field} must be between 1 and {MAX_SWEEP_POINTS}")
+                values = np.linspace(start, stop, steps)
+            if field != 'annual_mileage':
+                values = np.round(values)
+
+            low, high = SWEEP_RANGES[field]
+            if values.ndim != 1 or not len(values) or not np.all((values >= low) & (values <= high)):
+                raise QuoteRequestError(f"Sweep values for {field} must be between {low} and {high}")
+            dimensions.append((field, values))
+
+        points = int(np.prod([len(values) for _, values in dimensions]))
+        if points > MAX_SWEEP_POINTS:
+            raise QuoteRequestError(f"Sweep grid too large: {points} points, maximum is {MAX_SWEEP_POINTS}")
+        return dimensions
+
+    def what_if(self, user_data, sweep):
+        """Premium for an applicant over a grid of one or two swept fields
+
+        The base profile goes through prepare_features once; the grid is
+        the applicant's fields repeated with the swept ones replaced, run
+        through the feature transformer and priced together with the base
+        row in one predict call.
+        """
+        if not isinstance(user_data, dict):
+            raise QuoteRequestError("Request body must contain a profile object")
+        record = self.validate(user_data)
+        dimensions = self.parse_sweep(sweep)
+
+        base_features, _, _ = self.prepare_features(record)
+        cache_key = (tuple(base_features[0].tolist()),
+                     tuple((field, tuple(values.tolist())) for field, values in dimensions))
+        cached = self.sweep_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        # Full grid, first dimension varying slowest
+        mesh = np.meshgrid(*[values for _, values in dimensions], indexing='ij')
+        grid = {field: axis.ravel() for (field, _), axis in zip(dimensions, mesh)}
+        points = len(mesh[0].ravel())
+
+        # The applicant repeated over the grid, with the swept fields replaced
+        columns = {
+            field: np.full(points, getattr(record, field),
+                           dtype=object if field in CATEGORICAL_FIELDS else float)
+            for field in QUOTE_FIELDS
+        }
+        columns.update(grid)
+        # Row 0 is the base profile
+        premiums = self.predict(np.vstack([base_features, self.transformer.transform(columns)]))
+        base_premium = float(premiums[0])
+        premiums = premiums[1:]
+
+        response = {
+            "basePremium": round(base_premium, 2),
+            "dimensions": [
+                {"field": field, "values": [round(value, 2) for value in values.tolist()]}
+                for field, values in dimensions
+            ],
+            "premiums": np.round(premiums, 2).reshape(mesh[0].shape).tolist(),
+            "range": {
+                "min": round(float(premiums.min()), 2),
+                "max": round(float(premiums.max()), 2)
+            }
+        }
+
+        self.sweep_cache.put(cache_key, response)
+        return response
@@ -0,0 +1,83 @@
+from collections import namedtuple
+import numpy as np
+
+HIGH_MILEAGE_THRESHOLD = 20000
+
+# Summary of the monthly premiums in one segment of the reference data
+Segment = namedtuple('Segment', ['count', 'mean', 'min', 'max'])
+
+def mileage_band(annual_mileage):
+    """Return the mileage band ('high' or 'low') used by the segment tables"""
+    return 'high' if annual_mileage > HIGH_MILEAGE_THRESHOLD else 'low'
+
+def factorize(column):
+    """Return (codes, categories) for a column
+
+    A column that is already a (codes, categories) pair, as stored in the
+    serving bundle, is passed through unchanged.
+    """
+    if isinstance(column, tuple):
+        codes, categories = column
+        return np.asarray(codes), list(categories)
+    categories, codes = np.unique(np.asarray(column), return_inverse=True)
+    return codes.ravel(), categories.tolist()
+
+def _segment_table(premiums, *columns):
+    """Group premiums by one or more key columns into a {key: Segment} dict"""
+    factorized = [factorize(column) for column in columns]
+    codes = np.zeros(len(premiums), dtype=np.int64)
+    for column_codes, categories in factorized:
+        codes = codes * len(categories) + column_codes
+
+    order = np.argsort(codes, kind='mergesort')
+    sorted_codes = codes[order]
+    sorted_premiums = premiums[order]
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    counts = np.diff(np.r_[starts, len(sorted_codes)])
+
+    sums = np.add.reduceat(sorted_premiums, starts) if len(starts) else []
+    mins = np.minimum.reduceat(sorted_premiums, starts) if len(starts) else []
+    maxs = np.maximum.reduceat(sorted_premiums, starts) if len(starts) else []
+
+    table = {}
+    for start, count, total, low, high in zip(starts, counts, sums, mins, maxs):
+        first = order[start]
+        key = tuple(categories[column_codes[first]] for column_codes, categories in factorized)
+        table[key if len(key) > 1 else key[0]] = Segment(int(count), float(total / count), float(low), float(high))
+    return table
+
+class SegmentStats:
+    """Precomputed premium statistics for every comparison segment
+
+    Built once from the reference policies so that each quote only does
+    dictionary lookups instead of scanning the whole policy book. `reference`
+    maps column names to arrays (or (codes, categories) pairs).
+    """
+
+    def __init__(self, reference):
+        premiums = np.asarray(reference['monthly_premium'], dtype=float)
+        mileage = np.asarray(reference['annual_mileage'])
+
+        self.overall = Segment(
+            count=int(len(premiums)),
+            mean=float(premiums.mean()),
+            min=float(premiums.min()),
+            max=float(premiums.max())
+        )
+        self.tables = {
+            'age_group': _segment_table(premiums, reference['age_group']),
+            'vehicle_make': _segment_table(premiums, reference['vehicle_make']),
+            'smoker': _segment_table(premiums, reference['smoker']),
+            'mileage_band': _segment_table(
+                premiums, np.where(mileage > HIGH_MILEAGE_THRESHOLD, 'high', 'low')
+            )
+        }
+
+    def get(self, table, key):
+        """Return the Segment for key in table, or None if it has no policies"""
+        return self.tables[table].get(key)
+
+    def mean(self, table, key):
+        """Return the mean monthly premium for key in table (NaN if empty)"""
+        segment = self.get(table, key)
+        return segment.mean if segment is not None else float('nan')
@@ -0,0 +1,230 @@
+"""Offline synthetic policy generator for load and scale testing
+
+    python synthetic_data.py --rows 10000000 --workers 4 --out data/synthetic
+
+Generates policies with the same columns as data/insurance.csv, using the
+make weights, model catalog, usage/fuel mix and premium multipliers of
+data_download.py. The applicant columns and the base premium follow a model
+fitted to the 1,338-row source dataset, so no download is needed.
+
+Rows are generated in chunks of `chunk_size`, each from its own random
+stream spawned from the seed, so memory stays bounded by the chunk size and
+the output only depends on (rows, seed, chunk_size) - not on the number of
+worker processes. Every chunk is written as one partition directory of
+.npy columns; categorical columns are stored as uint8 codes and their
+categories are listed in manifest.json.
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from data_download import (
+    VEHICLE_MODELS, MAKE_WEIGHTS, USAGE_TYPES, USAGE_PROBS, FUEL_TYPES, FUEL_PROBS,
+    VEHICLE_YEAR_MIN, VEHICLE_YEAR_MAX, MILEAGE_MIN, MILEAGE_MAX, REFERENCE_YEAR,
+    YEARLY_DISCOUNT, COLUMNS, adjust_premiums
+)
+
+MANIFEST = 'manifest.json'
+
+CATEGORIES = {
+    'sex': ['female', 'male'],
+    'smoker': ['no', 'yes'],
+    'region': ['northeast', 'northwest', 'southeast', 'southwest'],
+    'vehicle_make': list(MAKE_WEIGHTS),
+    'vehicle_model': [model for make in MAKE_WEIGHTS for model in VEHICLE_MODELS[make]],
+    'usage_type': USAGE_TYPES,
+    'fuel_type': FUEL_TYPES
+}
+
+DTYPES = {
+    'age': np.uint8, 'bmi': np.float32, 'children': np.uint8,
+    'vehicle_year': np.int16, 'vehicle_age': np.int16, 'annual_mileage': np.int32,
+    'monthly_premium': np.float64, 'yearly_premium': np.float64
+}
+
+# Applicant mix of the source dataset
+AGE_MIN, AGE_MAX = 18, 64
+MALE_SHARE = 0.505
+SMOKER_SHARE = 0.205
+REGION_PROBS = [0.242, 0.243, 0.272, 0.243]
+CHILDREN_PROBS = [0.429, 0.242, 0.179, 0.117, 0.020, 0.013]
+BMI_MEAN, BMI_STD = 30.66, 6.10
+BMI_MIN, BMI_MAX = 15.96, 53.13
+
+# Base monthly premium: a least-squares fit to the source charges plus the
+# residual mix it leaves (a small normal spread and a ~9% high-claim group)
+BASE_PREMIUM = {
+    'intercept': -332.62, 'age_squared': 3.37, 'bmi': 27.54, 'children': 599.18,
+    'smoker': 14103.40, 'obese_smoker': 19240.30
+}
+PREMIUM_NOISE = 955.0
+HIGH_CLAIM_SHARE, HIGH_CLAIM_MEAN, HIGH_CLAIM_STD = 0.088, 14570.0, 4877.0
+MIN_PREMIUM = 1121.87
+
+def generate_chunk(rows, seed):
+    """{column: array} for `rows` policies from one random stream
+
+    seed is an int or a np.random.SeedSequence. Categorical columns are
+    uint8 codes into CATEGORIES.
+    """
+    rng = np.random.default_rng(seed)
+
+    age = rng.integers(AGE_MIN, AGE_MAX + 1, rows).astype(np.uint8)
+    sex = (rng.random(rows) < MALE_SHARE).astype(np.uint8)
+    bmi = np.clip(rng.normal(BMI_MEAN, BMI_STD, rows), BMI_MIN, BMI_MAX).round(2)
+    children = rng.choice(len(CHILDREN_PROBS), rows, p=CHILDREN_PROBS).astype(np.uint8)
+    smoker = (rng.random(rows) < SMOKER_SHARE).astype(np.uint8)
+    region = rng.choice(len(REGION_PROBS), rows, p=REGION_PROBS).astype(np.uint8)
+
+    # Make by market share, then a uniform model of that make
+    make = rng.choice(len(MAKE_WEIGHTS), rows, p=list(MAKE_WEIGHTS.values())).astype(np.uint8)
+    model_counts = np.array([len(VEHICLE_MODELS[name]) for name in MAKE_WEIGHTS])
+    model_offsets = np.concatenate([[0], np.cumsum(model_counts)[:-1]])
+    model = (model_offsets[make] + (rng.random(rows) * model_counts[make]).astype(np.int64)).astype(np.uint8)
+
+    vehicle_year = rng.integers(VEHICLE_YEAR_MIN, VEHICLE_YEAR_MAX, rows).astype(np.int16)
+    annual_mileage = rng.integers(MILEAGE_MIN, MILEAGE_MAX + 1, rows).astype(np.int32)
+    usage_type = rng.choice(len(USAGE_TYPES), rows, p=USAGE_PROBS).astype(np.uint8)
+    fuel_type = rng.choice(len(FUEL_TYPES), rows, p=FUEL_PROBS).astype(np.uint8)
+
+    weights = BASE_PREMIUM
+    premium = (weights['intercept'] + weights['age_squared'] * age.astype(np.float64) ** 2
+               + weights['bmi'] * bmi + weights['children'] * children
+               + smoker * (weights['smoker'] + weights['obese_smoker'] * (bmi >= 30)))
+    premium += rng.normal(0, PREMIUM_NOISE, rows)
+    high_claim = rng.random(rows) < HIGH_CLAIM_SHARE
+    premium[high_claim] += rng.normal(HIGH_CLAIM_MEAN, HIGH_CLAIM_STD, int(high_claim.sum()))
+    np.maximum(premium, MIN_PREMIUM, out=premium)
+
+    # The vehicle multipliers of the real dataset, applied to the coded columns
+    vehicle = ((make, CATEGORIES['vehicle_make']), (usage_type, USAGE_TYPES),
+               annual_mileage, (fuel_type, FUEL_TYPES))
+    monthly_premium = adjust_premiums(premium, *vehicle)
+    yearly_premium = adjust_premiums(premium * 12 * YEARLY_DISCOUNT, *vehicle)
+
+    return {
+        'age': age, 'sex': sex, 'bmi': bmi.astype(np.float32), 'children': children,
+        'smoker': smoker, 'region': region, 'vehicle_make': make, 'vehicle_model': model,
+        'vehicle_year': vehicle_year, 'vehicle_age': (REFERENCE_YEAR - vehicle_year).astype(np.int16),
+        'annual_mileage': annual_mileage, 'usage_type': usage_type, 'fuel_type': fuel_type,
+        'monthly_premium': monthly_premium.round(2), 'yearly_premium': yearly_premium.round(2)
+    }
+
+def policy_frame(rows, seed):
+    """generate_chunk() as a DataFrame with category labels, like the source dataset"""
+    columns = generate_chunk(rows, seed)
+    df = pd.DataFrame({
+        name: np.asarray(CATEGORIES[name], dtype=object)[values] if name in CATEGORIES else values
+        for name, values in columns.items()
+    })
+    df['bmi'] = df['bmi'].astype(np.float64).round(2)
+    return df
+
+def part_name(number):
+    return f"part-{number:05d}"
+
+def write_part(out_dir, number, rows, seed):
+    """Generate one chunk and write it as a partition of .npy columns"""
+    columns = generate_chunk(rows, seed)
+    path = os.path.join(out_dir, part_name(number))
+    os.makedirs(path, exist_ok=True)
+    for name, values in columns.items():
+        np.save(os.path.join(path, f"{name}.npy"), values)
+    return rows
+
+def generate_policies(rows, out_dir, seed=42, chunk_size=1_000_000, workers=1):
+    """Write `rows` synthetic policies to out_dir; returns the manifest
+
+    Partitions already in out_dir are replaced. With workers > 1 the chunks
+    are generated in that many processes; the output is identical either way.
+    """
+    chunk_size = max(1, min(chunk_size, rows))
+    sizes = [min(chunk_size, rows - start) for start in range(0, rows, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    os.makedirs(out_dir, exist_ok=True)
+    for name in os.listdir(out_dir):
+        if name == MANIFEST or name.startswith('part-'):
+            path = os.path.join(out_dir, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(write_part, [out_dir] * len(sizes), range(len(sizes)), sizes, seeds))
+    else:
+        for number, (size, part_seed) in enumerate(zip(sizes, seeds)):
+            write_part(out_dir, number, size, part_seed)
+
+    # Written last, so a directory without a manifest is an incomplete run
+    manifest = {
+        "rows": rows,
+        "seed": seed,
+        "chunk_size": chunk_size,
+        "parts": [{"name": part_name(number), "rows": size} for number, size in enumerate(sizes)],
+        "columns": {
+            name: {"dtype": "category", "categories": CATEGORIES[name]} if name in CATEGORIES
+            else {"dtype": np.dtype(DTYPES[name]).name}
+            for name in COLUMNS
+        }
+    }
+    with open(os.path.join(out_dir, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def read_manifest(out_dir):
+    with open(os.path.join(out_dir, MANIFEST)) as f:
+        return json.load(f)
+
+def iter_policy_chunks(out_dir, columns=None, mmap_mode=None):
+    """Yield one DataFrame per partition, categorical columns as category dtype"""
+    manifest = read_manifest(out_dir)
+    columns = columns or list(manifest['columns'])
+    for part in manifest['parts']:
+        path = os.path.join(out_dir, part['name'])
+        frame = {}
+        for name in columns:
+            values = np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+            info = manifest['columns'][name]
+            if info['dtype'] == 'category':
+                values = pd.Categorical.from_codes(values, categories=info['categories'])
+            frame[name] = values
+        yield pd.DataFrame(frame)
+
+def load_policies(out_dir, columns=None):
+    """All partitions as one DataFrame"""
+    return pd.concat(iter_policy_chunks(out_dir, columns), ignore_index=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic policies for load and scale testing")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="Number of policies")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunk-size', type=int, default=1_000_000,
+                        help="Policies per partition; bounds the memory of each worker")
+    parser.add_argument('--workers', type=int, default=1, help="Generator processes")
+    parser.add_argument('--out', default=os.path.join('data', 'synthetic'), help="Output directory")
+    args = parser.parse_args()
+
+    print(f"🎲 Generating {args.rows:,} policies (seed {args.seed}, {args.workers} worker(s))...")
+    start = time.perf_counter()
+    manifest = generate_policies(args.rows, args.out, args.seed, args.chunk_size, args.workers)
+    elapsed = time.perf_counter() - start
+
+    size = sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(args.out) for name in names
+    )
+    print(f"✅ {args.rows:,} policies in {len(manifest['parts'])} partition(s), "
+          f"{elapsed:.1f} s ({args.rows / elapsed:,.0f} rows/s), {size / 1e6:.0f} MB")
+    print(f"💾 Saved to: {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""Columnar storage for the processed dataset and the train/test splits
+
+A table is saved under a path without extension, in one or more formats:
+
+- npy: a directory holding one .npy file per column and schema.json
+  (always available; columns can be memory-mapped)
+- parquet, feather: a single file, needs pyarrow
+- csv: plain text, kept as an export format
+
+Before writing, string columns become categoricals and numeric columns are
+downcast to the smallest dtype that holds them exactly (int8/uint8/...;
+float32 only when no value changes). read_table() picks the first format
+present in TABLE_FORMATS order, so consumers do not need to know which one
+preprocessing.py wrote. DATA_FORMAT (comma-separated, default npy) sets the
+formats the pipeline writes.
+
+    python table_store.py --benchmark --rows 1000000
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+# Read preference order
+TABLE_FORMATS = ['npy', 'parquet', 'feather', 'csv']
+EXTENSIONS = {'npy': '', 'parquet': '.parquet', 'feather': '.feather', 'csv': '.csv'}
+SCHEMA = 'schema.json'
+
+# Formats TableWriter can write chunk by chunk
+CHUNKED_FORMATS = ['npy', 'csv']
+
+def default_formats():
+    """Formats the pipeline writes, from DATA_FORMAT"""
+    formats = [name.strip() for name in os.environ.get('DATA_FORMAT', 'npy').split(',') if name.strip()]
+    unknown = sorted(set(formats) - set(TABLE_FORMATS))
+    if unknown:
+        raise ValueError(f"Unknown DATA_FORMAT {', '.join(unknown)}; expected some of {', '.join(TABLE_FORMATS)}")
+    return formats
+
+def format_path(path, table_format):
+    return path + EXTENSIONS[table_format]
+
+def table_format(path):
+    """First format the table at path exists in, or None"""
+    for name in TABLE_FORMATS:
+        stored = format_path(path, name)
+        if name == 'npy':
+            if os.path.exists(os.path.join(stored, SCHEMA)):
+                return name
+        elif os.path.exists(stored):
+            return name
+    return None
+
+def compact_frame(df):
+    """Copy of df with category dtypes for strings and exactly-downcast numerics"""
+    columns = {}
+    for name in df.columns:
+        values = df[name]
+        if values.dtype == object or pd.api.types.is_string_dtype(values.dtype):
+            values = values.astype('category')
+        elif pd.api.types.is_integer_dtype(values.dtype):
+            downcast = 'unsigned' if len(values) and values.min() >= 0 else 'integer'
+            values = pd.to_numeric(values, downcast=downcast)
+        elif pd.api.types.is_float_dtype(values.dtype) and values.dtype != np.float32:
+            narrow = values.astype(np.float32)
+            if np.array_equal(narrow.to_numpy(dtype=np.float64), values.to_numpy(), equal_nan=True):
+                values = narrow
+        columns[name] = values
+    return pd.DataFrame(columns, index=df.index)
+
+def _schema_column(name, dtype, categories=None):
+    column = {"name": name, "dtype": np.dtype(dtype).str}
+    if categories is not None:
+        column["categories"] = list(categories)
+    return column
+
+def _write_schema(path, rows, columns):
+    with open(os.path.join(path, SCHEMA), 'w') as f:
+        json.dump({"rows": rows, "columns": columns}, f, indent=2)
+
+def _write_npy(df, path):
+    os.makedirs(path, exist_ok=True)
+    columns = []
+    for name in df.columns:
+        values = df[name]
+        categories = None
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            categories = values.cat.categories.tolist()
+            values = values.cat.codes
+        array = values.to_numpy()
+        np.save(os.path.join(path, f"{name}.npy"), array)
+        columns.append(_schema_column(name, array.dtype, categories))
+    _write_schema(path, len(df), columns)
+
+def _read_npy(path, columns, mmap_mode):
+    with open(os.path.join(path, SCHEMA)) as f:
+        schema = json.load(f)
+    data = {}
+    for column in schema["columns"]:
+        name = column["name"]
+        if columns is not None and name not in columns:
+            continue
+        values = np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+        if "categories" in column:
+            values = pd.Categorical.from_codes(values, categories=column["categories"])
+        data[name] = values
+    frame = pd.DataFrame(data)
+    return frame[columns] if columns is not None else frame
+
+def remove_table(path, formats=TABLE_FORMATS):
+    """Delete the stored copies of a table"""
+    for name in formats:
+        stored = format_path(path, name)
+        if name == 'npy':
+            if os.path.exists(os.path.join(stored, SCHEMA)):
+                shutil.rmtree(stored)
+        elif os.path.exists(stored):
+            os.remove(stored)
+
+def write_table(df, path, formats=None):
+    """Save df at path in each of formats (default: DATA_FORMAT)
+
+    Copies in other formats are removed so read_table() never finds a
+    stale one. A Series is saved as a one-column table.
+    """
+    formats = formats or default_formats()
+    if isinstance(df, pd.Series):
+        df = df.to_frame()
+    df = df.reset_index(drop=True)
+    remove_table(path, [name for name in TABLE_FORMATS if name not in formats])
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    for name in formats:
+        stored = format_path(path, name)
+        if name == 'csv':
+            df.to_csv(stored, index=False)
+            continue
+        compact = compact_frame(df)
+        if name == 'npy':
+            remove_table(path, ['npy'])
+            _write_npy(compact, stored)
+        elif name == 'parquet':
+            compact.to_parquet(stored, index=False)
+        else:
+            compact.to_feather(stored)
+
+class TableWriter:
+    """Write a table chunk by chunk when its row count and schema are known
+
+    columns maps every column to a NumPy dtype, or to its list of
+    categories for a categorical column. Every npy column file gets its
+    header for the final row count up front and each chunk is appended to
+    it (as CSV rows are), so memory use is that of one chunk. Only the npy
+    and csv formats can be written this way.
+    """
+
+    def __init__(self, path, rows, columns, formats=None):
+        self.formats = formats or default_formats()
+        unsupported = [name for name in self.formats if name not in CHUNKED_FORMATS]
+        if unsupported:
+            raise ValueError(f"Chunked writes support {' and '.join(CHUNKED_FORMATS)}, not {', '.join(unsupported)}")
+        self.path = path
+        self.rows = rows
+        self.columns = columns
+        self.written = 0
+
+        remove_table(path)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # name -> (open .npy file, dtype)
+        self.files = {}
+        if 'npy' in self.formats:
+            directory = format_path(path, 'npy')
+            os.makedirs(directory)
+            for name, kind in columns.items():
+                # Same code dtype pandas gives a categorical of this size
+                dtype = pd.Categorical([], categories=kind).codes.dtype if isinstance(kind, list) else np.dtype(kind)
+                f = open(os.path.join(directory, f"{name}.npy"), 'wb')
+                np.lib.format.write_array_header_1_0(f, {
+                    'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': (rows,)
+                })
+                self.files[name] = (f, dtype)
+
+    def write(self, df):
+        """Append the rows of df (which must have every column)"""
+        start, stop = self.written, self.written + len(df)
+        if stop > self.rows:
+            raise ValueError(f"{self.path}: more than the {self.rows} rows declared")
+        for name, (f, dtype) in self.files.items():
+            kind = self.columns[name]
+            if isinstance(kind, list):
+                values = pd.Categorical(df[name], categories=kind).codes
+            else:
+                values = df[name].to_numpy()
+            f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+        if 'csv' in self.formats:
+            df[list(self.columns)].to_csv(format_path(self.path, 'csv'), mode='a' if start else 'w',
+                                          header=not start, index=False)
+        self.written = stop
+
+    def close(self):
+        if self.written != self.rows:
+            raise ValueError(f"{self.path}: wrote {self.written} of {self.rows} rows")
+        if self.files:
+            columns = []
+            for name, (f, dtype) in self.files.items():
+                f.close()
+                kind = self.columns[name]
+                columns.append(_schema_column(name, dtype, kind if isinstance(kind, list) else None))
+            _write_schema(format_path(self.path, 'npy'), self.rows, columns)
+            self.files = {}
+
+def read_table(path, columns=None, categories=True, mmap_mode=None):
+    """Load the table saved at path (without extension) as a DataFrame
+
+    columns limits the columns read. categories=False turns categorical
+    columns back into plain strings, as read from the CSV. mmap_mode is
+    passed to np.load for the npy format.
+    """
+    found = table_format(path)
+    if found is None:
+        raise FileNotFoundError(f"No stored table at {path} ({', '.join(TABLE_FORMATS)})")
+    stored = format_path(path, found)
+    if found == 'npy':
+        df = _read_npy(stored, columns, mmap_mode)
+    elif found == 'parquet':
+        df = pd.read_parquet(stored, columns=columns)
+    elif found == 'feather':
+        df = pd.read_feather(stored, columns=columns)
+    else:
+        return pd.read_csv(stored, usecols=columns)
+    if not categories:
+        for name in df.columns:
+            if isinstance(df[name].dtype, pd.CategoricalDtype):
+                df[name] = df[name].astype(object)
+    return df
+
+def count_rows(path):
+    """Number of rows in the table at path"""
+    found = table_format(path)
+    if found == 'npy':
+        with open(os.path.join(format_path(path, 'npy'), SCHEMA)) as f:
+            return json.load(f)["rows"]
+    if found == 'csv':
+        with open(format_path(path, 'csv'), 'rb') as f:
+            return max(sum(1 for _ in f) - 1, 0)
+    return len(read_table(path))
+
+def stored_size(path, table_format):
+    stored = format_path(path, table_format)
+    if os.path.isdir(stored):
+        return sum(os.path.getsize(os.path.join(stored, name)) for name in os.listdir(stored))
+    return os.path.getsize(stored)
+
+def benchmark(rows, seed=42):
+    """Write/read time and size of a processed-like table in each format"""
+    from synthetic_data import policy_frame
+    from features import derive_columns, reference_year_of
+
+    df = policy_frame(rows, seed)
+    for name, values in derive_columns(df, reference_year_of(df['vehicle_year'], df['vehicle_age'])).items():
+        df[name] = values
+
+    results = []
+    directory = tempfile.mkdtemp()
+    try:
+        for name in TABLE_FORMATS:
+            path = os.path.join(directory, name, 'insurance_processed')
+            try:
+                start = time.perf_counter()
+                write_table(df, path, [name])
+                write_seconds = time.perf_counter() - start
+            except ImportError as e:
+                print(f"   {name}: skipped ({str(e).splitlines()[0]})")
+                continue
+            start = time.perf_counter()
+            read_table(path)
+            read_seconds = time.perf_counter() - start
+            results.append({
+                "format": name, "rows": rows, "size_mb": round(stored_size(path, name) / 1e6, 1),
+                "write_s": round(write_seconds, 3), "read_s": round(read_seconds, 3)
+            })
+    finally:
+        shutil.rmtree(directory)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar table storage")
+    parser.add_argument('--benchmark', action='store_true', help="Compare the storage formats")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+    if not args.benchmark:
+        parser.print_help()
+        return
+
+    print(f"📦 Storing {args.rows:,} processed policies in each format...")
+    for result in benchmark(args.rows):
+        print(f"   {result['format']:8} {result['size_mb']:8.1f} MB   "
+              f"write {result['write_s']:6.2f} s   read {result['read_s']:6.3f} s")
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,14 @@ from sklearn.ensemble import GradientBoostingRegressor
 from sklearn.model_selection import GridSearchCV
 from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
 import joblib
+import datetime
 import os
 
+from artifact_bundle import build_serving_bundle, BUNDLE_PATH
+from table_store import read_table
+from tree_engine import check_parity
+from model_registry import ModelRegistry, REGISTRY_DIR
+
 def train_premium_predictor():
     """Train ML model to predict insurance premiums"""
     
@@ -14,10 +20,10 @@ def train_premium_predictor():
     
     # Load preprocessed data
     print("\n📂 Loading training data...")
-    X_train = pd.read_csv('data/X_train.csv')
-    X_test = pd.read_csv('data/X_test.csv')
-    y_train = pd.read_csv('data/y_train.csv').values.ravel()
-    y_test = pd.read_csv('data/y_test.csv').values.ravel()
+    X_train = read_table('data/X_train')
+    X_test = read_table('data/X_test')
+    y_train = read_table('data/y_train').values.ravel()
+    y_test = read_table('data/y_test').values.ravel()
     
     print(f"   Training samples: {len(X_train)}")
     print(f"   Test samples: {len(X_test)}")
@@ -122,13 +128,26 @@ def train_premium_predictor():
         'test_rmse': test_rmse,
         'train_mae': train_mae,
         'test_mae': test_mae,
-        'best_params': grid_search.best_params_
+        'best_params': grid_search.best_params_,
+        'train_samples': len(X_train),
+        'test_samples': len(X_test),
+        'trained_at': datetime.datetime.now().isoformat(timespec='seconds')
     }
     joblib.dump(metrics, 'models/model_metrics.pkl')
     
+    # Compile model, encoders, scaler and reference data for the API servers
+    compiled_rows = check_parity(best_model, X_test)
+    build_serving_bundle()
+    
+    # Publish a versioned copy; running API servers pick up the new version
+    model_version = ModelRegistry().publish()
+    
     print(f"   ✓ Model saved to: models/premium_predictor.pkl")
     print(f"   ✓ Metrics saved to: models/model_metrics.pkl")
     print(f"   ✓ Feature importance saved to: models/feature_importance.csv")
+    print(f"   ✓ Compiled trees match sklearn on {compiled_rows:,} rows")
+    print(f"   ✓ Serving bundle saved to: {BUNDLE_PATH}")
+    print(f"   ✓ Published as model version {model_version} in {REGISTRY_DIR}")
     
     # Sample predictions
     print("\n🔮 Sample Predictions:")
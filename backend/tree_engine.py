@@ -0,0 +1,283 @@
+import numpy as np
+
+class CompiledEnsemble:
+    """Flattened, vectorized evaluator for a fitted GradientBoostingRegressor
+
+    Every tree is padded to a perfect binary tree of the ensemble's depth and
+    packed into contiguous arrays: `feature`/`threshold` hold the internal
+    nodes of all trees (tree-major, heap order) and `value` holds the leaves.
+    Small batches walk all trees for all rows one level at a time, so a call
+    costs `depth` vectorized steps instead of sklearn's per-estimator loop and
+    input validation.
+
+    Batches larger than `crossover` rows are scored from leaf bitmasks
+    instead (the QuickScorer scheme): every split that sends a row right
+    rules out the leaves of its left subtree, and the row's leaf in a tree is
+    the leftmost leaf no split ruled out. The splits on one feature that a
+    value sends right are the ones with a smaller threshold, so for each
+    feature the thresholds are sorted and `leaf_masks` holds the running AND
+    of their masks for every tree (in tables of TREE_BLOCK trees): a row
+    costs one searchsorted and one table lookup per feature, with no
+    per-node gathers. Trees deeper than
+    MAX_BITMASK_DEPTH have too many leaves for one word; their large batches
+    go to the original sklearn model when one is attached and are walked
+    otherwise.
+    """
+
+    # Rows evaluated per step; bounds the (rows x trees) working buffers
+    CHUNK_SIZE = 256
+
+    # Padding to a perfect tree costs 2**depth nodes per tree
+    MAX_DEPTH = 10
+
+    # A tree's leaves fit in one uint64 mask up to this depth
+    MAX_BITMASK_DEPTH = 6
+
+    # Trees sharing one leaf-mask table
+    TREE_BLOCK = 64
+
+    def __init__(self, feature, threshold, value, depth, init, learning_rate,
+                 n_features, dtype=np.float64, fallback=None, crossover=12):
+        self.dtype = np.dtype(dtype)
+        self.depth = int(depth)
+        self.feature = np.ascontiguousarray(feature, dtype=np.intp).ravel()
+        threshold = np.asarray(threshold, dtype=np.float64).ravel()
+        self.threshold = np.ascontiguousarray(threshold, dtype=self.dtype)
+        if self.dtype != np.float64:
+            # Inputs are float32 values; round every threshold down to the largest
+            # one <= the float64 threshold, so x > threshold decides as sklearn does
+            rounded_up = self.threshold > threshold
+            self.threshold[rounded_up] = np.nextafter(self.threshold[rounded_up], self.dtype.type(-np.inf))
+        self.value = np.ascontiguousarray(value, dtype=self.dtype).ravel()
+        self.init = float(init)
+        self.learning_rate = float(learning_rate)
+        self.n_features = int(n_features)
+        self.fallback = fallback
+        self.crossover = crossover
+
+        internal = 2 ** self.depth - 1
+        self.n_trees = len(self.feature) // internal
+        self._internal_offset = np.arange(self.n_trees, dtype=np.intp) * internal
+        self._leaf_offset = np.arange(self.n_trees, dtype=np.intp) * (internal + 1) - internal
+        self._root_feature = self.feature[self._internal_offset]
+        self._root_threshold = self.threshold[self._internal_offset]
+
+        self.leaf_masks = None
+        if self.depth <= self.MAX_BITMASK_DEPTH:
+            self._build_leaf_masks()
+
+    def _build_leaf_masks(self):
+        internal = 2 ** self.depth - 1
+        leaves = internal + 1
+        mask_dtype = np.dtype(np.uint16 if leaves <= 16 else np.uint32 if leaves <= 32 else np.uint64)
+        everything = int(np.iinfo(mask_dtype).max)
+
+        # Mask of a node going right: every leaf but those under its left child
+        node_mask = []
+        for position in range(internal):
+            first = last = 2 * position + 1
+            while first < internal:
+                first, last = 2 * first + 1, 2 * last + 2
+            left_leaves = ((1 << (last - first + 1)) - 1) << (first - internal)
+            node_mask.append(everything ^ left_leaves)
+        node_mask = np.array(node_mask, dtype=mask_dtype)
+
+        # Trees are grouped into blocks with a mask table each, which keeps
+        # the tables about (splits x TREE_BLOCK) rather than (splits x trees)
+        block = min(self.TREE_BLOCK, self.n_trees)
+        n_blocks = -(-self.n_trees // block)
+        feature = self.feature.reshape(self.n_trees, internal)
+        threshold = self.threshold.reshape(self.n_trees, internal)
+        self._split_thresholds = []
+        self._mask_rows = []
+        tables = []
+        start = 0
+        for f in range(self.n_features):
+            # Padding nodes (threshold inf) never go right
+            tree, position = np.nonzero((feature == f) & np.isfinite(threshold))
+            order = np.argsort(threshold[tree, position], kind='stable')
+            tree, position = tree[order], position[order]
+            # rows[k, b]: the leaf_masks row of block b once the k smallest
+            # thresholds on f have sent the row right
+            rows = np.empty((len(order) + 1, n_blocks), dtype=np.intp)
+            for b in range(n_blocks):
+                in_block = tree // block == b
+                splits = int(in_block.sum())
+                # Row j: the AND of the masks of the block's j smallest thresholds, per tree
+                table = np.full((splits + 1, block), everything, dtype=mask_dtype)
+                table[np.arange(1, splits + 1), tree[in_block] - b * block] = node_mask[position[in_block]]
+                tables.append(np.bitwise_and.accumulate(table, axis=0))
+                rows[0, b] = start
+                rows[1:, b] = start + np.cumsum(in_block)
+                start += splits + 1
+            self._split_thresholds.append(np.ascontiguousarray(threshold[tree, position]))
+            self._mask_rows.append(rows)
+        self.leaf_masks = np.concatenate(tables)
+        self._leaf_base = np.arange(self.n_trees, dtype=np.intp) * leaves - 1
+
+    @classmethod
+    def from_model(cls, model, dtype=np.float64, keep_fallback=True):
+        """Compile a fitted GradientBoostingRegressor"""
+        trees = [estimator.tree_ for estimator in model.estimators_[:, 0]]
+        depth = max(max(tree.max_depth for tree in trees), 1)
+        if depth > cls.MAX_DEPTH:
+            raise ValueError(f"Tree depth {depth} exceeds MAX_DEPTH={cls.MAX_DEPTH}")
+
+        internal = 2 ** depth - 1
+        feature = np.zeros((len(trees), internal), dtype=np.intp)
+        # Padding nodes always go left (x <= inf)
+        threshold = np.full((len(trees), internal), np.inf)
+        value = np.zeros((len(trees), internal + 1))
+
+        for t, tree in enumerate(trees):
+            # (sklearn node, heap position, level)
+            stack = [(0, 0, 0)]
+            while stack:
+                node, position, level = stack.pop()
+                if tree.children_left[node] == -1:
+                    # A leaf above the last level fills every leaf slot beneath it
+                    first = last = position
+                    for _ in range(depth - level):
+                        first, last = 2 * first + 1, 2 * last + 2
+                    value[t, first - internal:last - internal + 1] = tree.value[node, 0, 0]
+                    continue
+                feature[t, position] = tree.feature[node]
+                threshold[t, position] = tree.threshold[node]
+                stack.append((tree.children_left[node], 2 * position + 1, level + 1))
+                stack.append((tree.children_right[node], 2 * position + 2, level + 1))
+
+        if model.init_ == 'zero':
+            init = 0.0
+        else:
+            init = float(np.ravel(model.init_.constant_)[0])
+
+        return cls(
+            feature, threshold, value, depth, init, model.learning_rate,
+            model.n_features_in_, dtype=dtype,
+            fallback=model if keep_fallback else None
+        )
+
+    def predict(self, X):
+        """Predict premiums for a 2D feature matrix (rows x features)"""
+        X = np.asarray(X)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        predict_chunk = self._predict_chunk
+        if len(X) > self.crossover:
+            if self.leaf_masks is not None:
+                predict_chunk = self._score_chunk
+            elif self.fallback is not None:
+                return self.fallback.predict(X)
+
+        # sklearn evaluates trees on float32 inputs; do the same so that
+        # split decisions match exactly
+        X = np.ascontiguousarray(X, dtype=np.float32).astype(self.dtype)
+
+        out = np.empty(len(X))
+        for start in range(0, len(X), self.CHUNK_SIZE):
+            out[start:start + self.CHUNK_SIZE] = predict_chunk(X[start:start + self.CHUNK_SIZE])
+        return self.init + self.learning_rate * out
+
+    def _score_chunk(self, X):
+        remaining = None
+        for f, thresholds in enumerate(self._split_thresholds):
+            if not len(thresholds):
+                continue
+            # Splits on f that send the row right: the thresholds below its value
+            below = np.searchsorted(thresholds, X[:, f], side='left')
+            masks = self.leaf_masks.take(self._mask_rows[f].take(below, axis=0), axis=0)
+            if remaining is None:
+                remaining = masks
+            else:
+                remaining &= masks
+        if remaining is None:
+            remaining = np.ones((len(X), self.n_trees), dtype=self.leaf_masks.dtype)
+        remaining = remaining.reshape(len(X), -1)[:, :self.n_trees]
+
+        # Leftmost remaining leaf: the lowest set bit, whose exponent frexp reads
+        lowest = remaining & (~remaining + remaining.dtype.type(1))
+        leaf = np.frexp(lowest.astype(np.float64))[1]
+        leaf += self._leaf_base
+        return self.value.take(leaf).sum(axis=1, dtype=np.float64)
+
+    def _predict_chunk(self, X):
+        row_offset = (np.arange(len(X), dtype=np.intp) * X.shape[1])[:, None]
+        flat = X.ravel()
+
+        # Level 0: each tree's root tests a fixed feature
+        go_right = X[:, self._root_feature] > self._root_threshold
+        position = go_right.astype(np.intp)
+        position += 1
+
+        for _ in range(self.depth - 1):
+            node = position + self._internal_offset
+            column = self.feature.take(node)
+            column += row_offset
+            go_right = flat.take(column) > self.threshold.take(node)
+            position *= 2
+            position += 1
+            position += go_right
+
+        position += self._leaf_offset
+        return self.value.take(position).sum(axis=1, dtype=np.float64)
+
+def check_parity(model, X, sample=2000, seed=0):
+    """Compare CompiledEnsemble with model.predict in float64 and float32
+
+    Besides a sample of the rows of X, every split is tested at its
+    threshold: a sample row with the split's feature set to the threshold
+    as a float32 input would hold it, and to the float32 values either side.
+    Split decisions must match sklearn exactly, so predictions may differ
+    only by rounding of the leaf values. Returns the number of rows checked;
+    raises AssertionError.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    rows = X[np.random.default_rng(seed).permutation(len(X))[:sample]]
+
+    trees = [estimator.tree_ for estimator in model.estimators_[:, 0]]
+    feature = np.concatenate([tree.feature[tree.children_left != -1] for tree in trees])
+    threshold = np.concatenate([tree.threshold[tree.children_left != -1] for tree in trees])
+    at_threshold = threshold.astype(np.float32)
+    edges = []
+    for values in (at_threshold, np.nextafter(at_threshold, np.float32(-np.inf)),
+                   np.nextafter(at_threshold, np.float32(np.inf))):
+        edge = rows[np.arange(len(values)) % len(rows)].copy()
+        edge[np.arange(len(values)), feature] = values
+        edges.append(edge)
+    inputs = np.vstack([rows] + edges)
+
+    expected = model.predict(inputs)
+    for dtype, tolerance in ((np.float64, 1e-9), (np.float32, 1e-5)):
+        compiled = CompiledEnsemble.from_model(model, dtype=dtype, keep_fallback=False)
+        # Both the small-batch walk and the bitmask scorer
+        for crossover in (len(inputs), 0):
+            compiled.crossover = crossover
+            predicted = compiled.predict(inputs)
+            error = np.abs(predicted - expected) / np.maximum(np.abs(expected), 1.0)
+            if not error.max() <= tolerance:
+                row = int(np.argmax(error))
+                raise AssertionError(
+                    f"{np.dtype(dtype).name} compiled trees differ from sklearn on row {row}: "
+                    f"{predicted[row]:.4f} vs {expected[row]:.4f}"
+                )
+    return len(inputs)
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compiled tree-ensemble inference")
+    parser.add_argument('--check', action='store_true',
+                        help="Check the compiled model against sklearn, including inputs at every split threshold")
+    args = parser.parse_args()
+    if not args.check:
+        parser.print_help()
+        return
+
+    import joblib
+    from table_store import read_table
+    model = joblib.load('models/premium_predictor.pkl')
+    checked = check_parity(model, read_table('data/X_test').to_numpy())
+    print(f"✅ Compiled trees match sklearn on {checked:,} rows (float64 and float32)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import math
+
+REQUIRED_FIELDS = ['age', 'sex', 'smoker', 'vehicle_make', 'vehicle_year',
+                   'annual_mileage', 'usage_type', 'fuel_type']
+
+# Optional fields and the values used when they are left out
+DEFAULTS = {'bmi': 25.0, 'children': 0, 'region': 'northeast'}
+
+NUMERIC_FIELDS = ['age', 'bmi', 'children', 'annual_mileage', 'vehicle_year']
+INTEGER_FIELDS = ['age', 'children', 'vehicle_year']
+
+# Categorical request fields; values must be in the encoder vocabularies
+CATEGORICAL_FIELDS = ['sex', 'smoker', 'region', 'vehicle_make', 'usage_type', 'fuel_type']
+
+# Accepted (inclusive) ranges of the numeric fields
+FIELD_RANGES = {
+    'age': (18, 100),
+    'bmi': (10, 60),
+    'children': (0, 10),
+    'annual_mileage': (0, 100000),
+    'vehicle_year': (2000, 2025)
+}
+
+QUOTE_FIELDS = ['age', 'sex', 'bmi', 'children', 'smoker', 'region', 'vehicle_make',
+                'vehicle_year', 'annual_mileage', 'usage_type', 'fuel_type']
+
+class QuoteRequestError(ValueError):
+    """Raised for a quote request that is malformed (missing fields, bad values, bad batch body)
+
+    errors, when given, lists every problem as {"field", "message"} dicts.
+    """
+
+    def __init__(self, message, errors=None):
+        super().__init__(message)
+        self.errors = errors
+
+    def to_dict(self):
+        """JSON body of the 400 response"""
+        body = {"error": str(self)}
+        if self.errors:
+            body["field"] = self.errors[0]["field"]
+            body["errors"] = self.errors
+        return body
+
+class QuoteRecord:
+    """One validated applicant with every field coerced and defaulted"""
+
+    __slots__ = QUOTE_FIELDS
+
+    def __init__(self, age, sex, bmi, children, smoker, region, vehicle_make,
+                 vehicle_year, annual_mileage, usage_type, fuel_type):
+        self.age = age
+        self.sex = sex
+        self.bmi = bmi
+        self.children = children
+        self.smoker = smoker
+        self.region = region
+        self.vehicle_make = vehicle_make
+        self.vehicle_year = vehicle_year
+        self.annual_mileage = annual_mileage
+        self.usage_type = usage_type
+        self.fuel_type = fuel_type
+
+    def replace(self, **changes):
+        """Copy with some fields changed (the new values are not re-validated)"""
+        values = {field: getattr(self, field) for field in QUOTE_FIELDS}
+        values.update(changes)
+        return QuoteRecord(**values)
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in QUOTE_FIELDS}
+
+class _Invalid(Exception):
+    pass
+
+def _number_check(field, integer):
+    low, high = FIELD_RANGES[field]
+    expected = 'a whole number' if integer else 'a number'
+
+    def check(value):
+        kind = type(value)
+        # bool is an int subclass, so match the exact type
+        if kind is not int and kind is not float:
+            if kind is not str:
+                raise _Invalid(f"Invalid value for field {field}: expected {expected}")
+            try:
+                value = float(value)
+            except ValueError:
+                raise _Invalid(f"Invalid value for field {field}: expected {expected}, got {value!r}") from None
+        try:
+            in_range = math.isfinite(value) and low <= value <= high
+        except OverflowError:
+            # An int too large for a float
+            in_range = False
+        if not in_range:
+            raise _Invalid(f"Invalid value for field {field}: must be between {low} and {high}")
+        if integer:
+            if value != int(value):
+                raise _Invalid(f"Invalid value for field {field}: expected {expected}")
+            return int(value)
+        return float(value)
+    return check
+
+def _category_check(field, vocabulary):
+    allowed = frozenset(vocabulary)
+
+    def check(value):
+        if type(value) is not str or value not in allowed:
+            raise _Invalid(f"Unknown value for field {field}: {value!r}")
+        return value
+    return check
+
+def _compile_parser(vocabularies):
+    """Build parse(payload) -> QuoteRecord or None, specialised to the schema
+
+    The generated function checks every field inline with exact JSON types
+    (no per-field calls, no coercion), which is all a well-formed request
+    needs. Anything else - a missing or null field, a numeric string, a
+    float for an integer field, a bad value - returns None and is left to
+    QuoteValidator.errors() for the full report.
+    """
+    namespace = {'QuoteRecord': QuoteRecord}
+    lines = ["def parse(payload):", "    get = payload.get"]
+    for field in QUOTE_FIELDS:
+        lines.append(f"    {field} = get({field!r}, {DEFAULTS.get(field)!r})")
+        if field in INTEGER_FIELDS:
+            low, high = FIELD_RANGES[field]
+            lines.append(f"    if type({field}) is not int or not {low} <= {field} <= {high}: return None")
+        elif field in NUMERIC_FIELDS:
+            low, high = FIELD_RANGES[field]
+            lines += [
+                # ints are range-checked before float(), which overflows on huge ones
+                f"    if type({field}) is not float:",
+                f"        if type({field}) is not int or not {low} <= {field} <= {high}: return None",
+                f"        {field} = float({field})",
+                # Also false for NaN
+                f"    elif not {low} <= {field} <= {high}: return None"
+            ]
+        else:
+            namespace[f'{field}_allowed'] = frozenset(vocabularies[field])
+            lines.append(f"    if type({field}) is not str or {field} not in {field}_allowed: return None")
+    lines.append(f"    return QuoteRecord({', '.join(QUOTE_FIELDS)})")
+    exec('\n'.join(lines), namespace)
+    return namespace['parse']
+
+class QuoteValidator:
+    """Request validation compiled once from the field schema and encoder vocabularies
+
+    vocabularies maps each categorical field to its known categories (the
+    encoders' classes). validate() turns a JSON payload into a QuoteRecord,
+    coercing numeric strings, applying defaults and checking ranges and
+    categories; all problems with a payload are reported together.
+
+    Well-formed payloads take a parser generated from the schema; only a
+    payload it rejects goes through the per-field checks.
+    """
+
+    def __init__(self, vocabularies):
+        self.vocabularies = {field: sorted(vocabularies[field]) for field in CATEGORICAL_FIELDS}
+        # (field, check, required, default) in QuoteRecord order
+        self.checks = []
+        for field in QUOTE_FIELDS:
+            if field in NUMERIC_FIELDS:
+                check = _number_check(field, field in INTEGER_FIELDS)
+            else:
+                check = _category_check(field, self.vocabularies[field])
+            self.checks.append((field, check, field in REQUIRED_FIELDS, DEFAULTS.get(field)))
+        self.parse = _compile_parser(self.vocabularies)
+
+    def errors(self, payload):
+        """(values in QUOTE_FIELDS order, [error dicts]) for one payload"""
+        if not isinstance(payload, dict):
+            return None, [{"field": None, "message": "Record must be a JSON object"}]
+        values = []
+        errors = []
+        for field, check, required, default in self.checks:
+            value = payload.get(field)
+            if value is None:
+                if required:
+                    errors.append({"field": field, "message": f"Missing required field: {field}"})
+                values.append(default)
+                continue
+            try:
+                values.append(check(value))
+            except _Invalid as e:
+                error = {"field": field, "message": str(e)}
+                if field in self.vocabularies:
+                    error["allowed"] = self.vocabularies[field]
+                errors.append(error)
+                values.append(None)
+        return values, errors
+
+    def validate(self, payload):
+        """QuoteRecord for a payload; raises QuoteRequestError listing every problem"""
+        if isinstance(payload, dict):
+            record = self.parse(payload)
+            if record is not None:
+                return record
+        values, errors = self.errors(payload)
+        if errors:
+            raise QuoteRequestError(errors[0]["message"], errors)
+        return QuoteRecord(*values)
+
+    def validate_many(self, payloads):
+        """([QuoteRecord or None], {position: [error dicts]}) for a list of payloads"""
+        records = []
+        failures = {}
+        for position, payload in enumerate(payloads):
+            if isinstance(payload, dict):
+                record = self.parse(payload)
+                if record is not None:
+                    records.append(record)
+                    continue
+            values, errors = self.errors(payload)
+            if errors:
+                failures[position] = errors
+                records.append(None)
+            else:
+                records.append(QuoteRecord(*values))
+        return records, failures
@@ -1,21 +1,19 @@
+import shutil
 import subprocess
 import sys
 import os
 
 def run_command(command, description):
-    """Run a shell command and print status"""
+    """Run a command (list of arguments) and print status"""
     print(f"\n{'='*60}")
     print(f"🚀 {description}")
     print(f"{'='*60}\n")
     
     try:
-        if os.name == 'nt':  # Windows
-            subprocess.run(command, shell=True, check=True)
-        else:  # Unix/Linux/Mac
-            subprocess.run(command, shell=True, check=True, executable='/bin/bash')
+        subprocess.run(command, check=True)
         print(f"✅ {description} - COMPLETE\n")
         return True
-    except subprocess.CalledProcessError as e:
+    except (subprocess.CalledProcessError, OSError) as e:
         print(f"❌ {description} - FAILED")
         print(f"Error: {e}\n")
         return False
@@ -33,48 +31,29 @@ def main():
     """)
     
     # Change to backend directory
-    backend_dir = os.path.join(os.path.dirname(__file__), 'backend')
-    frontend_dir = os.path.join(os.path.dirname(__file__), 'frontend')
+    backend_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+    frontend_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'frontend')
     
     # Step 1: Install Python dependencies
     os.chdir(backend_dir)
     if not run_command(
-        f"{sys.executable} -m pip install -r requirements.txt",
+        [sys.executable, '-m', 'pip', 'install', '-r', 'requirements.txt'],
         "Installing Python dependencies"
     ):
         print("\n⚠️  Failed to install Python dependencies")
         return
     
-    # Step 2: Download dataset
-    if not run_command(
-        f"{sys.executable} data_download.py",
-        "Downloading and enhancing insurance dataset"
-    ):
-        print("\n⚠️  Failed to download dataset")
-        return
-    
-    # Step 3: Preprocess data
-    if not run_command(
-        f"{sys.executable} preprocessing.py",
-        "Preprocessing data and feature engineering"
-    ):
-        print("\n⚠️  Failed to preprocess data")
-        return
-    
-    # Step 4: Train ML model
-    if not run_command(
-        f"{sys.executable} train_models.py",
-        "Training AI premium prediction model"
-    ):
-        print("\n⚠️  Failed to train model")
-        return
-    
-    # Step 5: Generate insights
-    if not run_command(
-        f"{sys.executable} generate_visualizations.py",
-        "Generating user-friendly insights"
-    ):
-        print("\n⚠️  Failed to generate insights")
+    # Steps 2-5: download and preprocess the data, then train the model and
+    # generate insights in parallel; stages whose inputs did not change since
+    # the last run are skipped
+    sys.path.insert(0, backend_dir)
+    from pipeline import run_pipeline, print_report
+    
+    results = run_pipeline()
+    print_report(results)
+    failed = [name for name, status, _ in results if status in ('failed', 'blocked')]
+    if failed:
+        print(f"\n⚠️  Pipeline stage(s) failed: {', '.join(failed)}")
         return
     
     # Step 6: Install Node dependencies
@@ -84,8 +63,9 @@ def main():
     print("Changing to frontend directory...")
     os.chdir(frontend_dir)
     
+    # npm is a .cmd script on Windows, so resolve its full path
     if not run_command(
-        "npm install",
+        [shutil.which('npm') or 'npm', 'install'],
         "Installing React and dependencies"
     ):
         print("\n⚠️  Failed to install Node dependencies")